@@ -1,6 +1,10 @@
+import atexit
+import gzip
+import math
 import sqlite3
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import Any
+from typing import Any, Iterator
 
 import msgspec
 from flask import Flask, request, Response
@@ -12,22 +16,103 @@ from src.attributes import (
     get_all_names_with_attributes,
     get_column_names,
     get_column_unique_values,
+    get_column_value_counts,
     get_attributes,
+    get_attributes_by_key,
     get_search_results,
     get_centroid_at_name,
+    get_features_at_point,
+    get_column_values_by_name,
+)
+from src.bundles import GeoJSONBundle, bundle_key, get_bundle, get_bundle_etag
+from src.clusters import get_cluster_geojson_from_bounds
+from src.database import (
+    DATABASE_MMAP_SIZE_BYTES,
+    LevelOfDetail,
+    SpatialPartitions,
+    create_connection,
+    load_spatial_partitions,
+)
+from src.hierarchy import HierarchyInput, HierarchyTree, get_hierarchy_json, load_hierarchy_tree
+
+from src.csr_graph import CSR_DIRECTORY_NAME, CSRGraph, RoutingMode, read_csr_graph
+from src.graph import (
+    ConnectivityGraph,
+    GraphEngine,
+    get_source_node,
+    graph_shortest_path,
+    graph_flood_fill,
+    graph_upstream,
+)
+from src.graph_cache import GraphCache, create_graph_cache
+from src.network_graph import NetworkIndex, read_network_index
+from src.geometry import (
+    MIN_FEATURE_PIXELS,
+    Bounds,
+    get_features_by_name,
+    get_geojson_from_bounds,
+    clamp_zoom,
+    level_of_detail_from_zoom,
+    resolution_from_zoom,
+)
+from src.spatial_index import SpatialIndexEngine
+from src.bitmap_index import AttributeBitmapIndex
+from src.pagination import (
+    PAGE_CURSOR_HEADER,
+    PAGE_TOTAL_HEADER,
+    Page,
+    PageRequest,
+    page_headers,
+    paginate_iterator,
+)
+from src.stats import get_stats_json
+from src.tiles import get_tile
+from src.warm_up import WarmUpStatus, WarmUpStep, touch_file_pages, touch_spatial_indexes
+from src.switching import (
+    SwitchingScenario,
+    create_switching_executor,
+    each_edge_scenarios,
+    parse_scenarios,
+    run_scenarios,
+    scenario_result_dict,
 )
-from src.database import create_connection, LevelOfDetail
-from src.hierarchy import HierarchyInput, get_hierarchy_json
-
-from src.graph import graph_shortest_path, graph_flood_fill
-from src.geometry import Bounds, get_geojson_from_bounds
 
 app = Flask(__name__)
-CORS(app)
+CORS(app, expose_headers=[PAGE_TOTAL_HEADER, PAGE_CURSOR_HEADER])
 
 DATA_PATH: Path = Path(app.root_path) / "data"
 DATABASE_PATH: Path = DATA_PATH / "common_model.db"
 GRAPH_PATH: Path = DATA_PATH / "graphs"
+TILES_PATH: Path = DATA_PATH / "tiles.mbtiles"
+
+CLUSTER_ZOOM_THRESHOLD: float = 8.0
+USE_SPATIAL_INDEX_ENGINE: bool = False
+USE_SEARCH_INDEX: bool = True
+USE_FACET_INDEX: bool = True
+USE_BITMAP_INDEX: bool = False
+PAGE_SIZE_LIMIT: int = 10_000
+PICK_TOLERANCE_PIXELS: float = 5.0
+PICK_DEFAULT_TOLERANCE: float = 0.0001
+# The tolerance of a pick at the zoom where features replace clusters, about 3 km. Any
+# further out there are no individual features on the map to pick.
+PICK_MAX_TOLERANCE: float = PICK_TOLERANCE_PIXELS * resolution_from_zoom(CLUSTER_ZOOM_THRESHOLD)
+PICK_MAX_LIMIT: int = 100
+GRAPH_CACHE_MEMORY_BUDGET_BYTES: int = 2 * 1024**3
+GRAPH_CACHE_WARM_UP_COUNT: int = 5
+GRAPH_ENGINE: GraphEngine = GraphEngine.CSR
+SWITCHING_WORKER_COUNT: int = 4
+SWITCHING_BATCH_SIZE: int = 64
+
+spatial_index_engine: SpatialIndexEngine | None = None
+bitmap_index: AttributeBitmapIndex | None = None
+network_index: NetworkIndex | None = None
+switching_executor: ProcessPoolExecutor | None = None
+hierarchy_tree: HierarchyTree | None = None
+spatial_partitions: SpatialPartitions | None = None
+warm_up_status: WarmUpStatus = WarmUpStatus()
+graph_cache: GraphCache[ConnectivityGraph] | GraphCache[CSRGraph] = create_graph_cache(
+    GRAPH_PATH, GRAPH_CACHE_MEMORY_BUDGET_BYTES, GRAPH_ENGINE
+)
 
 
 @cross_origin(origins=["*"])
@@ -54,11 +139,29 @@ def column_unique_values() -> Response:
     if column not in column_names:
         return Response("[]", status=200, mimetype="application/json")
 
-    values: list[str] = get_column_unique_values(
-        connection, column, hierarchy_input=hierarchy_input
+    # Always capped, callers wanting every value follow the next page cursor
+    page_request: PageRequest | None = PageRequest.parse_request_args(
+        request.args, PAGE_SIZE_LIMIT
     )
-    json_bytes: bytes = msgspec.json.encode(values)
-    return Response(json_bytes, status=200, mimetype="application/json")
+    if page_request is None:
+        return Response("[]", status=200, mimetype="application/json")
+
+    if request.args.get("counts") == "true":
+        page: Page = get_column_value_counts(
+            connection, column, hierarchy_input, USE_FACET_INDEX, page_request
+        )
+        json_bytes: bytes = msgspec.json.encode(
+            [{"value": value, "count": count} for value, count in page.values]
+        )
+        return Response(
+            json_bytes, status=200, mimetype="application/json", headers=page_headers(page)
+        )
+
+    page = get_column_unique_values(
+        connection, column, hierarchy_input, USE_FACET_INDEX, page_request
+    )
+    json_bytes = msgspec.json.encode(page.values)
+    return Response(json_bytes, status=200, mimetype="application/json", headers=page_headers(page))
 
 
 @cross_origin(origins=["*"])
@@ -73,7 +176,9 @@ def search_complete() -> Response:
         return Response("[]", status=200, mimetype="application/json")
 
     connection: sqlite3.Connection = get_db()
-    results: list[str] = get_search_results(connection, typed_input, hierarchy_input)
+    results: list[str] = get_search_results(
+        connection, typed_input, hierarchy_input, use_search_index=USE_SEARCH_INDEX
+    )
     json_bytes: bytes = msgspec.json.encode(results)
     return Response(json_bytes, status=200, mimetype="application/json")
 
@@ -98,15 +203,13 @@ def centroid_at_name() -> Response:
 @cross_origin(origins=["*"])
 @app.route("/api/attributes", methods=["GET", "OPTIONS"])
 def attributes() -> Response:
-    bbox_param: str | None = request.args.get("bbox")
-    if not bbox_param:
-        return Response("[]", status=200, mimetype="application/json")
-
     object_name: str | None = request.args.get("name")
     if not object_name:
         return Response("[]", status=200, mimetype="application/json")
 
-    bounds: Bounds = Bounds.parse(bbox_param)
+    # The bounding box is optional, it only picks between features sharing a name
+    bbox_param: str | None = request.args.get("bbox")
+    bounds: Bounds | None = Bounds.parse(bbox_param) if bbox_param else None
     connection: sqlite3.Connection = get_db()
     attributes: dict[str, Any] | None = get_attributes(connection, object_name, bounds)
 
@@ -117,29 +220,97 @@ def attributes() -> Response:
     return Response(json_bytes, status=200, mimetype="application/json")
 
 
+@cross_origin(origins=["*"])
+@app.route("/api/attributes_batch", methods=["GET", "OPTIONS"])
+def attributes_batch() -> Response:
+    names: list[str] = [name for name in request.args.get("names", "").split(",") if name]
+    object_ids: list[int] = [
+        int(object_id)
+        for object_id in request.args.get("object_ids", "").split(",")
+        if object_id.strip().lstrip("-").isdigit()
+    ]
+
+    connection: sqlite3.Connection = get_db()
+    json_values: dict[str, Any] = {
+        "names": get_attributes_by_key(connection, "name", names),
+        "object_ids": get_attributes_by_key(connection, "object_id", object_ids),
+    }
+    json_bytes: bytes = msgspec.json.encode(json_values)
+    return Response(json_bytes, status=200, mimetype="application/json")
+
+
+@cross_origin(origins=["*"])
+@app.route("/api/pick", methods=["GET", "OPTIONS"])
+def pick() -> Response:
+    lon: float | None = request.args.get("lon", type=float)
+    lat: float | None = request.args.get("lat", type=float)
+    if lon is None or lat is None:
+        return Response("[]", status=200, mimetype="application/json")
+
+    zoom: float | None = clamp_zoom(request.args.get("zoom", type=float))
+    tolerance: float | None = request.args.get("tolerance", type=float)
+    if tolerance is None:
+        if zoom is not None:
+            tolerance = PICK_TOLERANCE_PIXELS * resolution_from_zoom(zoom)
+        else:
+            tolerance = PICK_DEFAULT_TOLERANCE
+    if not math.isfinite(tolerance):
+        tolerance = PICK_DEFAULT_TOLERANCE
+    tolerance = max(0.0, min(tolerance, PICK_MAX_TOLERANCE))
+
+    # SQLite treats a negative LIMIT as no limit
+    limit: int = max(1, min(request.args.get("limit", default=10, type=int), PICK_MAX_LIMIT))
+
+    level_of_detail: LevelOfDetail | None = LevelOfDetail.parse_request_args(request.args)
+    if level_of_detail is None:
+        level_of_detail = LevelOfDetail.ALL if zoom is None else level_of_detail_from_zoom(zoom)
+
+    hierarchy_input: HierarchyInput = HierarchyInput.parse_request_args(request.args)
+
+    connection: sqlite3.Connection = get_db()
+    features: list[dict[str, Any]] = get_features_at_point(
+        connection,
+        lon,
+        lat,
+        tolerance,
+        level_of_detail,
+        hierarchy_input,
+        limit,
+        spatial_partitions,
+    )
+    json_bytes: bytes = msgspec.json.encode(features)
+    return Response(json_bytes, status=200, mimetype="application/json")
+
+
 @cross_origin(origins=["*"])
 @app.route("/api/all_with_attribute", methods=["GET", "OPTIONS"])
 def all_with_attribute() -> Response:
-    column_name: str | None = request.args.get("column")
-    if not column_name:
+    # Repeat `column` and `value` to match on several columns at once
+    column_names: list[str] = request.args.getlist("column")
+    if not column_names:
         return Response("[]", status=200, mimetype="application/json")
 
-    value: str | None = request.args.get("value")
-    if not value:
+    values: list[str] = request.args.getlist("value")
+    if len(values) != len(column_names) or not all(values):
         return Response("[]", status=200, mimetype="application/json")
 
     hierarchy_input: HierarchyInput = HierarchyInput.parse_request_args(request.args)
+    page_request: PageRequest | None = PageRequest.parse_request_args(
+        request.args, PAGE_SIZE_LIMIT
+    )
+    if page_request is None:
+        return Response("[]", status=200, mimetype="application/json")
 
     connection: sqlite3.Connection = get_db()
-    names: list[str] | None = get_all_names_with_attributes(
-        connection, column_name, value, hierarchy_input
+    page: Page | None = get_all_names_with_attributes(
+        connection, list(zip(column_names, values)), hierarchy_input, bitmap_index, page_request
     )
 
-    if names is None:
+    if page is None:
         return Response("[]", status=200, mimetype="application/json")
 
-    json_bytes: bytes = msgspec.json.encode(names)
-    return Response(json_bytes, status=200, mimetype="application/json")
+    json_bytes: bytes = msgspec.json.encode(page.values)
+    return Response(json_bytes, status=200, mimetype="application/json", headers=page_headers(page))
 
 
 @cross_origin(origins=["*"])
@@ -165,16 +336,29 @@ def get_geojson() -> Response:
     bounds: Bounds = Bounds.parse(bbox_param)
     column: str | None = request.args.get("column")
 
+    zoom: float | None = clamp_zoom(request.args.get("zoom", type=float))
+    resolution: float | None = request.args.get("resolution", type=float)
+
     level_of_detail: LevelOfDetail | None = LevelOfDetail.parse_request_args(request.args)
 
     connection: sqlite3.Connection = get_db()
-    geojson_dict: dict[str, Any] | None = get_geojson_from_bounds(
-        connection=connection,
-        bounds=bounds,
-        attribute_column=column,
-        hierarchy_input=hierarchy_input,
-        level_of_detail=level_of_detail,
-    )
+    geojson_dict: dict[str, Any] | None = None
+    if level_of_detail is None and zoom is not None and zoom < CLUSTER_ZOOM_THRESHOLD:
+        geojson_dict = get_cluster_geojson_from_bounds(connection, bounds, hierarchy_input)
+
+    if geojson_dict is None:
+        geojson_dict = get_geojson_from_bounds(
+            connection=connection,
+            bounds=bounds,
+            attribute_column=column,
+            hierarchy_input=hierarchy_input,
+            level_of_detail=level_of_detail,
+            zoom=zoom,
+            resolution=resolution,
+            min_feature_pixels=MIN_FEATURE_PIXELS,
+            spatial_index=spatial_index_engine,
+            spatial_partitions=spatial_partitions,
+        )
 
     if geojson_dict is None:
         return Response("[]", status=200, mimetype="application/json")
@@ -191,12 +375,121 @@ def hierarchy_level() -> Response:
     hierarchy_input: HierarchyInput = HierarchyInput.parse_request_args(request.args)
 
     connection: sqlite3.Connection = get_db()
-    json_values: dict[str, Any] = get_hierarchy_json(connection, hierarchy_input)
+    json_values: dict[str, Any] = get_hierarchy_json(connection, hierarchy_input, hierarchy_tree)
     json_bytes: bytes = msgspec.json.encode(json_values)
     response = Response(json_bytes, status=200, mimetype="application/json")
     return response
 
 
+@cross_origin(origins=["*"])
+@app.route("/api/stats", methods=["GET", "OPTIONS"])
+def stats() -> Response:
+    hierarchy_input: HierarchyInput = HierarchyInput.parse_request_args(request.args)
+
+    connection: sqlite3.Connection = get_db()
+    json_values: dict[str, Any] = get_stats_json(connection, hierarchy_input)
+    json_bytes: bytes = msgspec.json.encode(json_values)
+    return Response(json_bytes, status=200, mimetype="application/json")
+
+
+@cross_origin(origins=["*"])
+@app.route("/api/bundle", methods=["GET", "OPTIONS"])
+def bundle() -> Response:
+    # The whole of a GXP or HV feeder in one pre-rendered response, so a scoped view can be
+    # panned on the client. Not found means the scope has no bundle and needs bbox queries.
+    hierarchy_input: HierarchyInput = HierarchyInput.parse_request_args(request.args)
+    key: tuple[str, str] | None = bundle_key(hierarchy_input)
+    level_of_detail: LevelOfDetail = (
+        LevelOfDetail.parse_request_args(request.args) or LevelOfDetail.ALL
+    )
+    if key is None:
+        return Response(status=404)
+
+    connection: sqlite3.Connection = get_db()
+    stored_etag: str | None = get_bundle_etag(connection, level_of_detail, key)
+    if stored_etag is None:
+        return Response(status=404)
+    # Each encoding is its own representation, so each needs its own strong ETag
+    use_gzip: bool = bool(request.accept_encodings["gzip"])
+    etag: str = f"{stored_etag}-gzip" if use_gzip else stored_etag
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+        response.set_etag(etag)
+        response.headers["Vary"] = "Accept-Encoding"
+        return response
+
+    geojson_bundle: GeoJSONBundle | None = get_bundle(connection, level_of_detail, key)
+    if geojson_bundle is None:
+        return Response(status=404)
+    if use_gzip:
+        response = Response(geojson_bundle.data, status=200, mimetype="application/json")
+        response.headers["Content-Encoding"] = "gzip"
+        response.set_etag(f"{geojson_bundle.etag}-gzip")
+    else:
+        response = Response(
+            gzip.decompress(geojson_bundle.data), status=200, mimetype="application/json"
+        )
+        response.set_etag(geojson_bundle.etag)
+    response.headers["Cache-Control"] = "no-cache"
+    response.headers["Vary"] = "Accept-Encoding"
+    return response
+
+
+@cross_origin(origins=["*"])
+@app.route("/api/tiles/<int:z>/<int:x>/<int:y>", methods=["GET", "OPTIONS"])
+def tile(z: int, x: int, y: int) -> Response:
+    # Pre-rendered by `refresh_databases.py --tiles`, not found when there is no archive
+    if not TILES_PATH.exists():
+        return Response(status=404)
+    if z < 0 or not (0 <= x < 2**z and 0 <= y < 2**z):
+        return Response(status=404)
+    data: bytes | None = get_tile(TILES_PATH, z, x, y)
+    if data is None:
+        # Tiles without features are not stored
+        json_bytes: bytes = msgspec.json.encode({"type": "FeatureCollection", "features": []})
+        return Response(json_bytes, status=200, mimetype="application/json")
+    if request.accept_encodings["gzip"]:
+        response = Response(data, status=200, mimetype="application/json")
+        response.headers["Content-Encoding"] = "gzip"
+    else:
+        response = Response(gzip.decompress(data), status=200, mimetype="application/json")
+    response.headers["Vary"] = "Accept-Encoding"
+    return response
+
+
+def encode_feature_collection(features: Iterator[dict[str, Any]]) -> Iterator[bytes]:
+    yield b'{"type":"FeatureCollection","features":['
+    for i, feature in enumerate(features):
+        if i > 0:
+            yield b","
+        yield msgspec.json.encode(feature)
+    yield b"]}"
+
+
+def trace_response(edge_names: list[str]) -> Response:
+    # With `geometry=true` the traced edges are streamed back as GeoJSON features instead
+    # of names, so the frontend can draw a trace without any further requests
+    if request.args.get("geometry", "false").lower() != "true":
+        json_bytes: bytes = msgspec.json.encode(edge_names)
+        return Response(json_bytes, status=200, mimetype="application/json")
+
+    columns: list[str] = request.args.get("columns", "").split(",")
+    zoom: float | None = clamp_zoom(request.args.get("zoom", type=float))
+    simplify_tolerance: float | None = resolution_from_zoom(zoom) if zoom is not None else None
+
+    def generate() -> Iterator[bytes]:
+        # The request's connection is closed on teardown before a streamed body is sent
+        connection: sqlite3.Connection = create_connection(DATABASE_PATH)
+        try:
+            yield from encode_feature_collection(
+                get_features_by_name(connection, edge_names, columns, simplify_tolerance)
+            )
+        finally:
+            connection.close()
+
+    return Response(generate(), status=200, mimetype="application/json")
+
+
 @cross_origin(origins=["*"])
 @app.route("/api/shortest_path", methods=["GET", "OPTIONS"])
 def shortest_path() -> Response:
@@ -212,12 +505,19 @@ def shortest_path() -> Response:
 
     hierarchy_input: HierarchyInput = HierarchyInput.parse_request_args(request.args)
 
+    routing: RoutingMode = RoutingMode.parse_request_args(request.args)
+
     json_values: list[str] = graph_shortest_path(
-        hierarchy_input, GRAPH_PATH, node_a, node_b, edges_to_exclude
+        hierarchy_input,
+        GRAPH_PATH,
+        node_a,
+        node_b,
+        edges_to_exclude,
+        graph_cache,
+        network_index,
+        routing,
     )
-    json_bytes: bytes = msgspec.json.encode(json_values)
-    response = Response(json_bytes, status=200, mimetype="application/json")
-    return response
+    return trace_response(json_values)
 
 
 @cross_origin(origins=["*"])
@@ -233,13 +533,104 @@ def flood_fill() -> Response:
         edges_to_exclude = exclude.split(",")
 
     hierarchy_input: HierarchyInput = HierarchyInput.parse_request_args(request.args)
+    page_request: PageRequest | None = PageRequest.parse_request_args(
+        request.args, PAGE_SIZE_LIMIT
+    )
+    if page_request is None:
+        return app.response_class("[]")
 
-    json_values: list[str] = graph_flood_fill(hierarchy_input, GRAPH_PATH, node, edges_to_exclude)
-    json_bytes: bytes = msgspec.json.encode(json_values)
-    response = Response(json_bytes, status=200, mimetype="application/json")
+    json_values: Iterator[str] = graph_flood_fill(
+        hierarchy_input, GRAPH_PATH, node, edges_to_exclude, graph_cache, network_index
+    )
+    # The traversal stops at the end of the page, later pages replay it up to their start
+    page: Page = paginate_iterator(json_values, page_request)
+    response: Response = trace_response(page.values)
+    response.headers.update(page_headers(page))
     return response
 
 
+@cross_origin(origins=["*"])
+@app.route("/api/upstream", methods=["GET", "OPTIONS"])
+def upstream() -> Response:
+    node: str | None = request.args.get("node")
+    if node is None:
+        return app.response_class("[]")
+
+    hierarchy_input: HierarchyInput = HierarchyInput.parse_request_args(request.args)
+
+    # Supply trees are only stored in the CSR format, a networkx cache would load pickles
+    hops: list[tuple[str, str]] = graph_upstream(
+        hierarchy_input,
+        GRAPH_PATH,
+        node,
+        graph_cache if GRAPH_ENGINE == GraphEngine.CSR else None,
+        network_index,
+    )
+    edge_names: list[str] = [edge for edge, _ in hops]
+    if request.args.get("geometry", "false").lower() == "true":
+        return trace_response(edge_names)
+
+    hierarchy_levels: dict[str, Any] = get_column_values_by_name(
+        get_db(), edge_names, "hierarchy_level"
+    )
+    json_values: list[dict[str, Any]] = [
+        {"edge": edge, "node": upstream_node, "hierarchy_level": hierarchy_levels.get(edge)}
+        for edge, upstream_node in hops
+    ]
+    json_bytes: bytes = msgspec.json.encode(json_values)
+    return Response(json_bytes, status=200, mimetype="application/json")
+
+
+@cross_origin(origins=["*"])
+@app.route("/api/switching_scenarios", methods=["GET", "OPTIONS"])
+def switching_scenarios() -> Response:
+    gxp_name: str | None = request.args.get("gxp")
+    if gxp_name is None or not (GRAPH_PATH / gxp_name / CSR_DIRECTORY_NAME).is_dir():
+        return app.response_class("", mimetype="application/x-ndjson")
+
+    source: str | None = request.args.get("source")
+    if source is None:
+        source = get_source_node(get_db(), gxp_name)
+    if source is None:
+        return app.response_class("", mimetype="application/x-ndjson")
+
+    scenarios: list[SwitchingScenario] = []
+    if request.args.get("each_edge", "false").lower() == "true":
+        scenarios = each_edge_scenarios(read_csr_graph(GRAPH_PATH / gxp_name), source)
+    elif "scenarios" in request.args:
+        scenarios = parse_scenarios(request.args["scenarios"])
+
+    def generate(source: str) -> Iterator[bytes]:
+        results = run_scenarios(
+            get_switching_executor(),
+            GRAPH_PATH / gxp_name,
+            source,
+            scenarios,
+            SWITCHING_BATCH_SIZE,
+        )
+        for completed, result in enumerate(results, start=1):
+            yield msgspec.json.encode(scenario_result_dict(result, completed, len(scenarios)))
+            yield b"\n"
+
+    return Response(generate(source), status=200, mimetype="application/x-ndjson")
+
+
+@cross_origin(origins=["*"])
+@app.route("/api/graph_cache", methods=["GET", "OPTIONS"])
+def graph_cache_stats() -> Response:
+    json_bytes: bytes = msgspec.json.encode(graph_cache.stats())
+    return Response(json_bytes, status=200, mimetype="application/json")
+
+
+@cross_origin(origins=["*"])
+@app.route("/api/ready", methods=["GET", "OPTIONS"])
+def ready() -> Response:
+    # Not ready until warm-up has finished, requests before then are answered but slower
+    status: dict[str, Any] = warm_up_status.status_dict()
+    json_bytes: bytes = msgspec.json.encode(status)
+    return Response(json_bytes, status=200 if status["ready"] else 503, mimetype="application/json")
+
+
 def get_db() -> sqlite3.Connection:
     db = getattr(g, "_database", None)
     if db is None:
@@ -254,5 +645,74 @@ def close_connection(exception: Any) -> None:
         db.close()
 
 
+def load_spatial_index_engine() -> None:
+    global spatial_index_engine
+    connection: sqlite3.Connection = create_connection(DATABASE_PATH)
+    spatial_index_engine = SpatialIndexEngine.load(connection)
+    connection.close()
+
+
+def load_bitmap_index() -> None:
+    global bitmap_index
+    connection: sqlite3.Connection = create_connection(DATABASE_PATH)
+    bitmap_index = AttributeBitmapIndex.load(connection)
+    connection.close()
+
+
+def get_switching_executor() -> ProcessPoolExecutor:
+    global switching_executor
+    if switching_executor is None:
+        switching_executor = create_switching_executor(SWITCHING_WORKER_COUNT)
+        atexit.register(switching_executor.shutdown, cancel_futures=True)
+    return switching_executor
+
+
+def load_hierarchy() -> None:
+    global hierarchy_tree
+    connection: sqlite3.Connection = create_connection(DATABASE_PATH)
+    hierarchy_tree = load_hierarchy_tree(connection)
+    connection.close()
+
+
+def load_partitions() -> None:
+    global spatial_partitions
+    connection: sqlite3.Connection = create_connection(DATABASE_PATH)
+    spatial_partitions = load_spatial_partitions(connection)
+    connection.close()
+
+
+def load_network_index() -> None:
+    global network_index
+    network_index = read_network_index(GRAPH_PATH)
+
+
+def warm_up_spatial_indexes() -> None:
+    # Also loads SpatiaLite, which the first connection would otherwise pay for
+    connection: sqlite3.Connection = create_connection(DATABASE_PATH)
+    touch_spatial_indexes(connection)
+    connection.close()
+
+
+def warm_up_steps() -> list[WarmUpStep]:
+    steps: list[WarmUpStep] = [
+        ("database_pages", lambda: touch_file_pages(DATABASE_PATH, DATABASE_MMAP_SIZE_BYTES)),
+        ("spatial_indexes", warm_up_spatial_indexes),
+        ("hierarchy", load_hierarchy),
+    ]
+    if USE_SPATIAL_INDEX_ENGINE:
+        steps.append(("spatial_index_engine", load_spatial_index_engine))
+    if USE_BITMAP_INDEX:
+        steps.append(("bitmap_index", load_bitmap_index))
+    if GRAPH_ENGINE == GraphEngine.CSR:
+        steps.append(("network_index", load_network_index))
+    steps.append(("graphs", lambda: graph_cache.warm_up(GRAPH_CACHE_WARM_UP_COUNT)))
+    if TILES_PATH.exists():
+        steps.append(("tile_pages", lambda: touch_file_pages(TILES_PATH, DATABASE_MMAP_SIZE_BYTES)))
+    return steps
+
+
 if __name__ == "__main__":
+    load_partitions()
+    warm_up_status.start(warm_up_steps())
+    atexit.register(graph_cache.write_usage)
     serve(app, port=8000)
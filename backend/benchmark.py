@@ -0,0 +1,344 @@
+#!/usr/bin/env python3
+import random
+import sqlite3
+import statistics
+import time
+import tracemalloc
+from argparse import ArgumentParser, Namespace
+from pathlib import Path
+from typing import Any, Callable
+
+from networkx import NetworkXNoPath, node_connected_component, shortest_path
+
+from src.csr_graph import CSRGraph, RoutingMode
+from src.database import (
+    GEOMETRY_FIELD_NAME,
+    LevelOfDetail,
+    create_connection,
+    level_of_detail_table,
+)
+from src.geometry import Bounds, get_geojson_from_bounds
+from src.attributes import get_all_names_with_attributes, get_search_results
+from src.bitmap_index import AttributeBitmapIndex
+from src.graph import ConnectivityGraph, graph_without_edges
+from src.graph_cache import load_csr_graph, load_networkx_graph
+from src.hierarchy import HierarchyInput
+from src.network_graph import NETWORK_DIRECTORY_NAME
+from src.spatial_index import SpatialIndexEngine
+
+
+DATA_PATH: Path = Path(__file__).parent / "data"
+
+DEFAULT_DATABASE_PATH: Path = DATA_PATH / "common_model.db"
+DEFAULT_GRAPH_PATH: Path = DATA_PATH / "graphs"
+
+
+def time_calls(name: str, function: Callable[[Any], Any], inputs: list[Any]) -> None:
+    durations: list[float] = []
+    for value in inputs:
+        start: float = time.perf_counter()
+        function(value)
+        durations.append((time.perf_counter() - start) * 1000)
+
+    durations.sort()
+    p95: float = durations[int(len(durations) * 0.95) - 1] if durations else 0
+    print(
+        f"{name:<32} n={len(durations):<5} "
+        f"mean={statistics.fmean(durations) if durations else 0:8.2f}ms "
+        f"median={statistics.median(durations) if durations else 0:8.2f}ms "
+        f"p95={p95:8.2f}ms"
+    )
+
+
+def data_extent(connection: sqlite3.Connection) -> Bounds:
+    table_name: str = level_of_detail_table(LevelOfDetail.GXP)
+    cursor = connection.cursor()
+    cursor.execute(f"""
+    SELECT
+        MIN(MbrMinX({GEOMETRY_FIELD_NAME})),
+        MIN(MbrMinY({GEOMETRY_FIELD_NAME})),
+        MAX(MbrMaxX({GEOMETRY_FIELD_NAME})),
+        MAX(MbrMaxY({GEOMETRY_FIELD_NAME}))
+    FROM {table_name};
+    """)
+    row = cursor.fetchone()
+    cursor.close()
+    return Bounds(*row)
+
+
+def random_bounds(extent: Bounds, width: float, count: int, seed: int) -> list[Bounds]:
+    rng = random.Random(seed)
+    bounds: list[Bounds] = []
+    for _ in range(count):
+        min_x: float = rng.uniform(extent.min_x, max(extent.min_x, extent.max_x - width))
+        min_y: float = rng.uniform(extent.min_y, max(extent.min_y, extent.max_y - width))
+        bounds.append(Bounds(min_x, min_y, min_x + width, min_y + width))
+    return bounds
+
+
+def benchmark_spatial_index(args: Namespace) -> None:
+    connection: sqlite3.Connection = create_connection(args.db_path)
+    extent: Bounds = data_extent(connection)
+    hierarchy_input: HierarchyInput = HierarchyInput.new()
+
+    start: float = time.perf_counter()
+    engine: SpatialIndexEngine = SpatialIndexEngine.load(connection)
+    print(f"Engine load time: {time.perf_counter() - start:.2f}s")
+
+    for width in [0.01, 0.05, 0.5]:
+        queries: list[Bounds] = random_bounds(extent, width, args.count, args.seed)
+        print(f"\nBounding box width {width} degrees")
+
+        def sqlite_query(bounds: Bounds) -> Any:
+            return get_geojson_from_bounds(connection, bounds, None, hierarchy_input)
+
+        def engine_query(bounds: Bounds) -> Any:
+            return get_geojson_from_bounds(
+                connection, bounds, None, hierarchy_input, spatial_index=engine
+            )
+
+        time_calls("sqlite r-tree", sqlite_query, queries)
+        time_calls("in-memory packed index", engine_query, queries)
+
+    connection.close()
+
+
+def measure_load(name: str, function: Callable[[], Any]) -> Any:
+    tracemalloc.start()
+    start: float = time.perf_counter()
+    result: Any = function()
+    duration: float = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{name:<32} load={duration * 1000:8.2f}ms peak_memory={peak / 1024**2:8.2f}MiB")
+    return result
+
+
+def graph_directories(args: Namespace) -> list[Path]:
+    graph_path: Path = Path(args.graph_path)
+    if args.gxp is not None:
+        return [graph_path / args.gxp]
+    return sorted(
+        path
+        for path in graph_path.iterdir()
+        if path.is_dir() and path.name != NETWORK_DIRECTORY_NAME
+    )
+
+
+def benchmark_graph_engines(args: Namespace) -> None:
+    rng = random.Random(args.seed)
+    for path in graph_directories(args):
+        print(f"\nGXP `{path.name}`")
+        networkx_graph: ConnectivityGraph = measure_load(
+            "networkx", lambda: load_networkx_graph(path)[0]
+        )
+        csr_graph: CSRGraph = measure_load("csr", lambda: load_csr_graph(path)[0])
+
+        nodes: list[str] = [csr_graph.node_names[i] for i in range(len(csr_graph.node_names))]
+        if not nodes:
+            continue
+        pairs: list[tuple[str, str]] = [
+            (rng.choice(nodes), rng.choice(nodes)) for _ in range(args.count)
+        ]
+
+        def networkx_shortest_path(pair: tuple[str, str]) -> Any:
+            graph = graph_without_edges(networkx_graph, [])
+            try:
+                return shortest_path(graph, pair[0], pair[1])
+            except NetworkXNoPath:
+                return None
+
+        def csr_shortest_path(pair: tuple[str, str]) -> Any:
+            return csr_graph.shortest_path(pair[0], pair[1])
+
+        def networkx_flood_fill(pair: tuple[str, str]) -> Any:
+            component: set[str] = node_connected_component(networkx_graph.graph, pair[0])
+            return list(networkx_graph.graph.subgraph(component).edges(keys=True))
+
+        def csr_flood_fill(pair: tuple[str, str]) -> Any:
+            return list(csr_graph.flood_fill(pair[0]))
+
+        time_calls("networkx shortest path", networkx_shortest_path, pairs)
+        time_calls("csr shortest path", csr_shortest_path, pairs)
+        time_calls("networkx flood fill", networkx_flood_fill, pairs)
+        time_calls("csr flood fill", csr_flood_fill, pairs)
+
+
+def benchmark_routing(args: Namespace) -> None:
+    rng = random.Random(args.seed)
+    for path in graph_directories(args):
+        csr_graph: CSRGraph = load_csr_graph(path)[0]
+        node_count: int = len(csr_graph.node_names)
+        if node_count == 0:
+            continue
+
+        # Only pairs in the same component, unreachable pairs return before any search
+        id_pairs: list[tuple[int, int]] = []
+        for _ in range(args.count * 10):
+            id_a: int = rng.randrange(node_count)
+            id_b: int = rng.randrange(node_count)
+            if csr_graph.component_labels[id_a] == csr_graph.component_labels[id_b]:
+                id_pairs.append((id_a, id_b))
+            if len(id_pairs) == args.count:
+                break
+        if not id_pairs:
+            continue
+        pairs: list[tuple[str, str]] = [
+            (csr_graph.node_names[id_a], csr_graph.node_names[id_b]) for id_a, id_b in id_pairs
+        ]
+        print(f"\nGXP `{path.name}` nodes={node_count}")
+
+        for routing in RoutingMode:
+
+            def route(pair: tuple[str, str]) -> Any:
+                return csr_graph.shortest_path(pair[0], pair[1], routing=routing)
+
+            time_calls(f"{routing.name.lower()} shortest path", route, pairs)
+
+        # Breadth first search and Dijkstra settle every node in the component
+        component_sizes: list[int] = []
+        astar_expanded: list[int] = []
+        for id_a, id_b in id_pairs:
+            component_sizes.append(len(csr_graph.reachable(id_a, None)[0]))
+            astar_expanded.append(csr_graph.astar(id_a, id_b, None)[1])
+        print(
+            f"{'nodes explored':<32} "
+            f"hops/length={statistics.fmean(component_sizes):10.1f} "
+            f"astar={statistics.fmean(astar_expanded):10.1f}"
+        )
+
+
+def benchmark_search(args: Namespace) -> None:
+    connection: sqlite3.Connection = create_connection(args.db_path)
+    rng = random.Random(args.seed)
+    hierarchy_input: HierarchyInput = HierarchyInput.new()
+
+    cursor = connection.cursor()
+    cursor.execute(f"""
+    SELECT name
+    FROM {level_of_detail_table(LevelOfDetail.ALL)}
+    WHERE name IS NOT NULL AND LENGTH(name) >= 3
+    ORDER BY RANDOM()
+    LIMIT {args.count};
+    """)
+    names: list[str] = [row[0] for row in cursor.fetchall()]
+    cursor.close()
+
+    # Typed inputs are substrings of real names, as a user would type part of one
+    inputs: list[str] = []
+    for name in names:
+        length: int = rng.randint(3, min(8, len(name)))
+        start: int = rng.randrange(len(name) - length + 1)
+        stop: int = start + length
+        inputs.append(name[start:stop])
+
+    def like_search(typed_input: str) -> Any:
+        return get_search_results(connection, typed_input, hierarchy_input)
+
+    def index_search(typed_input: str) -> Any:
+        return get_search_results(
+            connection, typed_input, hierarchy_input, use_search_index=True
+        )
+
+    time_calls("like scan", like_search, inputs)
+    time_calls("fts5 trigram index", index_search, inputs)
+
+    connection.close()
+
+
+def benchmark_bitmap_index(args: Namespace) -> None:
+    connection: sqlite3.Connection = create_connection(args.db_path)
+    rng = random.Random(args.seed)
+
+    start: float = time.perf_counter()
+    index: AttributeBitmapIndex = AttributeBitmapIndex.load(connection)
+    print(f"Index load time: {time.perf_counter() - start:.2f}s")
+    column_names: list[str] = list(index.columns.keys())
+
+    cursor = connection.cursor()
+    cursor.execute(f"""
+    SELECT gxp_name, {", ".join(column_names)}
+    FROM {level_of_detail_table(LevelOfDetail.ALL)}
+    ORDER BY RANDOM()
+    LIMIT {args.count};
+    """)
+    rows = cursor.fetchall()
+    cursor.close()
+
+    # Filters take the values of real rows, passed as text as they are in requests
+    for filter_count in [1, 2, 3]:
+        for scoped in [False, True]:
+            queries: list[tuple[list[tuple[str, Any]], HierarchyInput]] = []
+            for row in rows:
+                columns: list[int] = rng.sample(range(len(column_names)), filter_count)
+                filters: list[tuple[str, Any]] = [
+                    (column_names[i], str(row[i + 1])) for i in columns if row[i + 1] is not None
+                ]
+                if filters:
+                    hierarchy_input: HierarchyInput = (
+                        HierarchyInput.new(gxp_name=row[0]) if scoped else HierarchyInput.new()
+                    )
+                    queries.append((filters, hierarchy_input))
+            print(f"\n{filter_count} column filters{', scoped to a GXP' if scoped else ''}")
+
+            def sql_query(query: tuple[list[tuple[str, Any]], HierarchyInput]) -> Any:
+                return get_all_names_with_attributes(connection, query[0], query[1])
+
+            def bitmap_query(query: tuple[list[tuple[str, Any]], HierarchyInput]) -> Any:
+                return get_all_names_with_attributes(
+                    connection, query[0], query[1], bitmap_index=index
+                )
+
+            time_calls("sqlite scan", sql_query, queries)
+            time_calls("bitmap index", bitmap_query, queries)
+
+    connection.close()
+
+
+def main() -> None:
+    parser = ArgumentParser(description="Benchmark backend query paths against a built database.")
+
+    parser.add_argument(
+        "--db-path",
+        type=str,
+        default=DEFAULT_DATABASE_PATH,
+        help=f"Path to the SQLite database (default: {DEFAULT_DATABASE_PATH})",
+    )
+    parser.add_argument(
+        "--graph-path",
+        type=str,
+        default=DEFAULT_GRAPH_PATH,
+        help=f"Path to the graph files (default: {DEFAULT_GRAPH_PATH})",
+    )
+    parser.add_argument("--count", type=int, default=200, help="Queries per benchmark")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed for generated queries")
+    parser.add_argument("--gxp", type=str, default=None, help="Only benchmark this GXP's graph")
+
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+
+    subparsers.add_parser(
+        "spatial-index", help="SQLite R-tree against the in-memory packed spatial index"
+    ).set_defaults(function=benchmark_spatial_index)
+
+    subparsers.add_parser(
+        "graph-engines", help="networkx MultiGraph against the CSR graph engine"
+    ).set_defaults(function=benchmark_graph_engines)
+
+    subparsers.add_parser(
+        "routing", help="Hop count, length weighted Dijkstra and A* shortest paths"
+    ).set_defaults(function=benchmark_routing)
+
+    subparsers.add_parser(
+        "search", help="LIKE scan against the trigram search index for search_complete"
+    ).set_defaults(function=benchmark_search)
+
+    subparsers.add_parser(
+        "bitmap-index", help="SQLite scan against the attribute bitmap index for all_with_attribute"
+    ).set_defaults(function=benchmark_bitmap_index)
+
+    args = parser.parse_args()
+    args.function(args)
+
+
+if __name__ == "__main__":
+    main()
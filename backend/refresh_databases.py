@@ -1,14 +1,20 @@
 #!/usr/bin/env python3
+import os
+import sqlite3
 from argparse import ArgumentParser
 from pathlib import Path
 
 from src.initialise_databases import create_or_replace_databases
+from src.tiles import create_tile_archive
 
 
 DATA_PATH: Path = Path(__file__).parent / "data"
 
 DEFAULT_DATABASE_PATH: Path = DATA_PATH / "common_model.db"
 DEFAULT_GRAPH_PATH: Path = DATA_PATH / "graphs"
+DEFAULT_TILES_PATH: Path = DATA_PATH / "tiles.mbtiles"
+DEFAULT_TILE_MAX_ZOOM: int = 10
+TILE_BATCH_SIZE: int = 32
 
 
 def main() -> None:
@@ -30,6 +36,26 @@ def main() -> None:
         help="Path to the connectivity CSV file (default read from common model database)",
     )
 
+    parser.add_argument(
+        "--tiles",
+        action="store_true",
+        help=f"Pre-render a tile pyramid into `{DEFAULT_TILES_PATH}`",
+    )
+
+    parser.add_argument(
+        "--tile-max-zoom",
+        type=int,
+        default=DEFAULT_TILE_MAX_ZOOM,
+        help=f"Deepest zoom level to pre-render (default: {DEFAULT_TILE_MAX_ZOOM})",
+    )
+
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Processes rendering tiles (default: number of cores)",
+    )
+
     args = parser.parse_args()
 
     db_path: Path = Path(args.db_path)
@@ -42,9 +68,15 @@ def main() -> None:
     print(f"Graph path `{graph_path}`")
     print(f"Connectivity CSV: `{connectivity_path}`")
 
-    create_or_replace_databases(
+    connection: sqlite3.Connection = create_or_replace_databases(
         db_path=db_path, graph_path=graph_path, connectivity_path=connectivity_path
     )
+    connection.close()
+
+    if args.tiles:
+        create_tile_archive(
+            db_path, DEFAULT_TILES_PATH, args.tile_max_zoom, args.workers, TILE_BATCH_SIZE
+        )
 
     print("Database initialized successfully.")
 
@@ -1,15 +1,31 @@
 import sqlite3
 from typing import Any
 
+import numpy as np
+
+from src.bitmap_index import AttributeBitmapIndex
 from src.common_model import CONNECTIVITY_COLUMNS
 from src.database import (
+    EPSG,
     LevelOfDetail,
+    SpatialPartitions,
     level_of_detail_table,
     INDEX_COLUMN,
     GEOMETRY_FIELD_NAME,
 )
+from src.facets import get_facet_value_counts
 from src.hierarchy import HierarchyInput
-from src.geometry import Bounds
+from src.pagination import (
+    Page,
+    PageRequest,
+    create_page,
+    keyset_condition,
+    limit_clause,
+    paginate_sorted,
+)
+from src.geometry import NAME_BATCH_SIZE, Bounds, get_spatial_index_name
+from src.search import SEARCH_INDEX_MIN_LENGTH, get_search_index_results
+from src.spatial_index import IntArray
 
 
 def get_column_names(connection: sqlite3.Connection, fast: bool = True) -> list[str]:
@@ -33,38 +49,87 @@ def get_column_names(connection: sqlite3.Connection, fast: bool = True) -> list[
 
 
 def get_column_unique_values(
-    connection: sqlite3.Connection, column: str, hierarchy_input: HierarchyInput
-) -> list[Any]:
+    connection: sqlite3.Connection,
+    column: str,
+    hierarchy_input: HierarchyInput,
+    use_facet_index: bool = False,
+    page_request: PageRequest | None = None,
+) -> Page:
+    page: Page = get_column_value_counts(
+        connection, column, hierarchy_input, use_facet_index, page_request
+    )
+    return page._replace(values=[value for value, _ in page.values])
+
+
+def get_column_value_counts(
+    connection: sqlite3.Connection,
+    column: str,
+    hierarchy_input: HierarchyInput,
+    use_facet_index: bool = False,
+    page_request: PageRequest | None = None,
+) -> Page:
+    if use_facet_index:
+        value_counts: list[tuple[Any, int]] | None = get_facet_value_counts(
+            connection, column, hierarchy_input
+        )
+        if value_counts is not None:
+            return paginate_sorted(
+                value_counts, [value for value, _ in value_counts], page_request
+            )
+
     where_statement, parameters = hierarchy_input.create_sql_where_clause()
+    table_name: str = level_of_detail_table(LevelOfDetail.ALL)
+    keyset_statement, keyset_parameters = keyset_condition(column, page_request)
     sql: str = f"""
     SELECT
-        DISTINCT {column}
-    FROM {level_of_detail_table(LevelOfDetail.ALL)}
-    WHERE {where_statement.removeprefix(" AND ")}
-    ORDER BY {column};
+        {column}, COUNT(*)
+    FROM {table_name}
+    WHERE {where_statement.removeprefix(" AND ")}{keyset_statement}
+    GROUP BY {column}
+    ORDER BY {column}{limit_clause(page_request)};
     """
 
     cursor = connection.cursor()
-    cursor.execute(sql, parameters)
-    rows = cursor.fetchall()
-
-    values: list[str] = []
-
-    for row in rows:
-        value: str = row[0]
-        values.append(value)
+    cursor.execute(sql, parameters + keyset_parameters)
+    value_counts = [(row[0], row[1]) for row in cursor]
 
+    total: int = len(value_counts)
+    if page_request is not None:
+        cursor.execute(
+            f"""
+            SELECT COUNT(DISTINCT {column}) + MAX({column} IS NULL)
+            FROM {table_name}
+            WHERE {where_statement.removeprefix(" AND ")};
+            """,
+            parameters,
+        )
+        total = cursor.fetchone()[0] or 0
     cursor.close()
-    return values
+
+    return create_page(
+        value_counts,
+        [value for value, _ in value_counts],
+        total,
+        page_request.limit if page_request is not None else None,
+    )
 
 
 def get_search_results(
-    connection: sqlite3.Connection, typed_input: str, hierarchy_input: HierarchyInput
+    connection: sqlite3.Connection,
+    typed_input: str,
+    hierarchy_input: HierarchyInput,
+    use_search_index: bool = False,
 ) -> list[str]:
     if not typed_input.strip():
         return []
     if len(typed_input) < 2:
         return []
+    if use_search_index and len(typed_input) >= SEARCH_INDEX_MIN_LENGTH:
+        index_results: list[str] | None = get_search_index_results(
+            connection, typed_input, hierarchy_input
+        )
+        if index_results is not None:
+            return index_results
 
     where_statement, parameters = hierarchy_input.create_sql_where_clause()
     sql: str = f"""
@@ -110,22 +175,31 @@ def get_centroid_at_name(connection: sqlite3.Connection, name: str) -> tuple[flo
 
 
 def get_attributes(
-    connection: sqlite3.Connection, name: str, bounds: Bounds
+    connection: sqlite3.Connection, name: str, bounds: Bounds | None = None
 ) -> dict[str, Any] | None:
-    bounds = bounds.overfit(percent_overfit=100)
+    # Rows are found through the name index. The bounds only choose between features
+    # sharing a name, preferring one in view
     table_name: str = level_of_detail_table(LevelOfDetail.ALL)
+    order_statement: str = INDEX_COLUMN
+    parameters: list[Any] = [name]
+    if bounds is not None:
+        bounds = bounds.overfit(percent_overfit=100)
+        order_statement = f"""(
+            MbrMaxX({GEOMETRY_FIELD_NAME}) >= ? AND MbrMinX({GEOMETRY_FIELD_NAME}) <= ?
+            AND MbrMaxY({GEOMETRY_FIELD_NAME}) >= ? AND MbrMinY({GEOMETRY_FIELD_NAME}) <= ?
+        ) DESC, {INDEX_COLUMN}"""
+        parameters.extend([bounds.min_x, bounds.max_x, bounds.min_y, bounds.max_y])
     sql: str = f"""
     SELECT
         {", ".join(CONNECTIVITY_COLUMNS.keys())}
     FROM {table_name}
-    JOIN idx_{table_name}_{GEOMETRY_FIELD_NAME} AS r
-    ON id = r.pkid
-    WHERE r.xmax >= ? AND r.xmin <= ? AND r.ymax >= ? AND r.ymin <= ?
-    AND name = ?;
+    WHERE name = ?
+    ORDER BY {order_statement}
+    LIMIT 1;
     """
 
     cursor = connection.cursor()
-    cursor.execute(sql, [bounds.min_x, bounds.max_x, bounds.min_y, bounds.max_y, name])
+    cursor.execute(sql, parameters)
     row = cursor.fetchone()
     cursor.close()
 
@@ -135,27 +209,161 @@ def get_attributes(
     return dict(zip(CONNECTIVITY_COLUMNS.keys(), row))
 
 
+def get_attributes_by_key(
+    connection: sqlite3.Connection, key_column: str, keys: list[Any]
+) -> dict[Any, dict[str, Any]]:
+    # Batched lookups on an indexed column, `name` or `object_id`, keeping the first row
+    # for keys shared by several features
+    table_name: str = level_of_detail_table(LevelOfDetail.ALL)
+    column_names: list[str] = list(CONNECTIVITY_COLUMNS.keys())
+    key_index: int = column_names.index(key_column)
+    attributes: dict[Any, dict[str, Any]] = {}
+    cursor = connection.cursor()
+    for start in range(0, len(keys), NAME_BATCH_SIZE):
+        stop: int = start + NAME_BATCH_SIZE
+        batch: list[Any] = keys[start:stop]
+        sql: str = f"""
+        SELECT
+            {", ".join(column_names)}
+        FROM {table_name}
+        WHERE {key_column} IN ({", ".join("?" for _ in batch)})
+        ORDER BY {INDEX_COLUMN};
+        """
+        cursor.execute(sql, batch)
+        for row in cursor.fetchall():
+            if row[key_index] not in attributes:
+                attributes[row[key_index]] = dict(zip(column_names, row))
+    cursor.close()
+    return attributes
+
+
 def get_all_names_with_attributes(
-    connection: sqlite3.Connection, column_name: str, value: Any, hierarchy_input: HierarchyInput
-) -> list[str] | None:
-    if column_name not in CONNECTIVITY_COLUMNS:
+    connection: sqlite3.Connection,
+    filters: list[tuple[str, Any]],
+    hierarchy_input: HierarchyInput,
+    bitmap_index: AttributeBitmapIndex | None = None,
+    page_request: PageRequest | None = None,
+) -> Page | None:
+    if any(column_name not in CONNECTIVITY_COLUMNS for column_name, _ in filters):
         return None
-    parameters: list[Any] = [value]
+    limit: int | None = page_request.limit if page_request is not None else None
+
+    if bitmap_index is not None and bitmap_index.has_columns([name for name, _ in filters]):
+        # Keyed by position in the index, which is sorted by the hierarchy
+        positions: IntArray = bitmap_index.query(filters, hierarchy_input)
+        total: int = len(positions)
+        if page_request is not None and page_request.has_cursor:
+            if not isinstance(page_request.after, int):
+                return Page([], total, None)
+            start: int = int(np.searchsorted(positions, page_request.after, "right"))
+            positions = positions[start:]
+        if limit is not None:
+            positions = positions[: limit + 1]
+        return create_page(
+            list(bitmap_index.names[positions]), [int(i) for i in positions], total, limit
+        )
+
+    parameters: list[Any] = [value for _, value in filters]
     where_statement, extra_parameters = hierarchy_input.create_sql_where_clause()
     parameters.extend(extra_parameters)
     table_name: str = level_of_detail_table(LevelOfDetail.ALL)
+    filter_statement: str = " AND ".join(f"{column_name} = ?" for column_name, _ in filters)
+    keyset_statement, keyset_parameters = keyset_condition(INDEX_COLUMN, page_request)
     sql: str = f"""
     SELECT
-        name
+        {INDEX_COLUMN}, name
     FROM {table_name}
-    WHERE {column_name} = ? {where_statement};
+    WHERE {filter_statement} {where_statement}{keyset_statement}
+    ORDER BY {INDEX_COLUMN}{limit_clause(page_request)};
     """
     cursor = connection.cursor()
-    cursor.execute(sql, parameters)
+    cursor.execute(sql, parameters + keyset_parameters)
+    ids: list[int] = []
     names: list[str] = []
+    for row in cursor:
+        ids.append(row[0])
+        name: str = row[1]
+        names.append(name)
+
+    total = len(names)
+    if page_request is not None:
+        cursor.execute(
+            f"SELECT COUNT(*) FROM {table_name} WHERE {filter_statement} {where_statement};",
+            parameters,
+        )
+        total = cursor.fetchone()[0]
+    cursor.close()
+    return create_page(names, ids, total, limit)
+
+
+def get_features_at_point(
+    connection: sqlite3.Connection,
+    x: float,
+    y: float,
+    tolerance: float,
+    level_of_detail: LevelOfDetail,
+    hierarchy_input: HierarchyInput,
+    limit: int,
+    spatial_partitions: SpatialPartitions | None = None,
+) -> list[dict[str, Any]]:
+    table_name: str = level_of_detail_table(level_of_detail)
+    rtree_name: str = get_spatial_index_name(
+        connection, table_name, hierarchy_input, spatial_partitions
+    )
+    distance: str = f"ST_Distance({GEOMETRY_FIELD_NAME}, MakePoint(?, ?, {EPSG}))"
+
+    parameters: list[Any] = [x, y, x - tolerance, x + tolerance, y - tolerance, y + tolerance]
+    where_statement, extra_parameters = hierarchy_input.create_sql_where_clause()
+    parameters.extend(extra_parameters)
+    parameters.extend([x, y, tolerance, limit])
+
+    sql: str = f"""
+    SELECT
+        {", ".join(CONNECTIVITY_COLUMNS.keys())},
+        {distance} AS distance
+    FROM {table_name}
+    JOIN {rtree_name} AS r
+    ON id = r.pkid
+    WHERE r.xmax >= ? AND r.xmin <= ? AND r.ymax >= ? AND r.ymin <= ?
+    {where_statement}
+    AND {distance} <= ?
+    ORDER BY distance
+    LIMIT ?;
+    """
+
+    cursor = connection.cursor()
+    cursor.execute(sql, parameters)
     rows = cursor.fetchall()
+    cursor.close()
+
+    features: list[dict[str, Any]] = []
     for row in rows:
-        name: str = row[0]
-        names.append(name)
+        feature: dict[str, Any] = dict(zip(CONNECTIVITY_COLUMNS.keys(), row))
+        feature["distance"] = row[-1]
+        features.append(feature)
+    return features
+
+
+def get_column_values_by_name(
+    connection: sqlite3.Connection, names: list[str], column_name: str
+) -> dict[str, Any]:
+    if column_name not in CONNECTIVITY_COLUMNS:
+        return {}
+    table_name: str = level_of_detail_table(LevelOfDetail.ALL)
+    values: dict[str, Any] = {}
+    cursor = connection.cursor()
+    for start in range(0, len(names), NAME_BATCH_SIZE):
+        stop: int = start + NAME_BATCH_SIZE
+        batch: list[str] = names[start:stop]
+        sql: str = f"""
+        SELECT
+            name,
+            {column_name}
+        FROM {table_name}
+        WHERE name IN ({", ".join("?" for _ in batch)});
+        """
+        cursor.execute(sql, batch)
+        for row in cursor.fetchall():
+            values[row[0]] = row[1]
     cursor.close()
-    return names
+    return values
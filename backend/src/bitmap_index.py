@@ -0,0 +1,221 @@
+import sqlite3
+import time
+from typing import Any, NamedTuple
+
+import numpy as np
+import numpy.typing as npt
+
+from src.common_model import CONNECTIVITY_COLUMNS
+from src.database import LevelOfDetail, level_of_detail_table
+from src.hierarchy import HIERARCHY_COLUMNS, HierarchyInput
+from src.spatial_index import BoolArray, EncodedColumn, IntArray, ObjectArray, encode_column
+
+
+# Columns with more distinct values than this are left to SQL
+BITMAP_MAX_VALUES: int = 256
+# Values on fewer than one in this many rows keep a sorted row list instead of a bitmap
+BITMAP_MIN_DENSITY: int = 32
+
+ByteArray = npt.NDArray[np.uint8]
+
+
+class AttributeColumn(NamedTuple):
+    encoded_column: EncodedColumn
+    numeric: bool
+    # One of the two is set per value code, depending on how many rows have the value
+    row_lists: list[IntArray | None]
+    bitmaps: list[ByteArray | None]
+
+    def value_code(self, value: Any) -> int | None:
+        # Compare like SQLite, which converts text to a number for numeric columns
+        if self.numeric and isinstance(value, str):
+            for convert in (int, float):
+                try:
+                    return self.encoded_column.lookup.get(convert(value))
+                except ValueError:
+                    continue
+        return self.encoded_column.lookup.get(value)
+
+
+def create_attribute_column(
+    encoded_column: EncodedColumn, column_type: str, row_count: int
+) -> AttributeColumn:
+    codes: IntArray = encoded_column.codes
+    value_count: int = len(encoded_column.lookup)
+    order: IntArray = np.argsort(codes, kind="stable")
+    value_starts: IntArray = np.zeros(value_count + 1, dtype=np.int64)
+    np.cumsum(np.bincount(codes, minlength=value_count), out=value_starts[1:])
+
+    row_lists: list[IntArray | None] = []
+    bitmaps: list[ByteArray | None] = []
+    for code in range(value_count):
+        start: int = int(value_starts[code])
+        stop: int = int(value_starts[code + 1])
+        rows: IntArray = order[start:stop]
+        if len(rows) * BITMAP_MIN_DENSITY < row_count:
+            row_lists.append(rows)
+            bitmaps.append(None)
+        else:
+            mask = np.zeros(row_count, dtype=np.bool_)
+            mask[rows] = True
+            row_lists.append(None)
+            bitmaps.append(np.packbits(mask))
+    return AttributeColumn(encoded_column, column_type != "TEXT", row_lists, bitmaps)
+
+
+def bitmap_contains(bitmap: ByteArray, rows: IntArray) -> BoolArray:
+    bits: ByteArray = (bitmap[rows >> 3] >> (7 - (rows & 7))) & 1
+    return bits.astype(np.bool_)
+
+
+def bitmap_rows(bitmaps: list[ByteArray], start: int, stop: int) -> IntArray:
+    byte_start: int = start >> 3
+    byte_stop: int = (stop + 7) >> 3
+    combined: ByteArray = bitmaps[0][byte_start:byte_stop].copy()
+    for bitmap in bitmaps[1:]:
+        np.bitwise_and(combined, bitmap[byte_start:byte_stop], out=combined)
+    offset: int = start - byte_start * 8
+    offset_stop: int = offset + stop - start
+    bits: ByteArray = np.unpackbits(combined)[offset:offset_stop]
+    return np.flatnonzero(bits) + start
+
+
+class AttributeBitmapIndex:
+    # Rows are sorted by the hierarchy, so every hierarchy node is a contiguous row range,
+    # and low cardinality columns are dictionary encoded with a bitmap or row list per value
+    def __init__(
+        self,
+        names: ObjectArray,
+        hierarchy_columns: dict[str, EncodedColumn],
+        node_rows: dict[tuple[int, ...], tuple[int, int]],
+        columns: dict[str, AttributeColumn],
+    ) -> None:
+        self.names = names
+        self.hierarchy_columns = hierarchy_columns
+        self.node_rows = node_rows
+        self.columns = columns
+
+    @classmethod
+    def load(cls, connection: sqlite3.Connection) -> "AttributeBitmapIndex":
+        start_time: float = time.perf_counter()
+        table_name: str = level_of_detail_table(LevelOfDetail.ALL)
+        print(f"Loading `{table_name}` into the attribute bitmap index")
+
+        column_names: list[str] = list(CONNECTIVITY_COLUMNS.keys())
+        cursor = connection.cursor()
+        cursor.execute(f"""
+        SELECT
+            {", ".join(column_names)}
+        FROM {table_name}
+        ORDER BY {", ".join(HIERARCHY_COLUMNS)};
+        """)
+        rows = cursor.fetchall()
+        cursor.close()
+        row_count: int = len(rows)
+
+        values_by_column: dict[str, ObjectArray] = {}
+        for i, column_name in enumerate(column_names):
+            values: ObjectArray = np.empty(row_count, dtype=object)
+            values[:] = [row[i] for row in rows]
+            values_by_column[column_name] = values
+
+        hierarchy_columns: dict[str, EncodedColumn] = {
+            column_name: encode_column(values_by_column[column_name])
+            for column_name in HIERARCHY_COLUMNS
+        }
+        node_rows: dict[tuple[int, ...], tuple[int, int]] = {}
+        if row_count > 0:
+            keys: IntArray = np.stack(
+                [hierarchy_columns[column_name].codes for column_name in HIERARCHY_COLUMNS],
+                axis=1,
+            )
+            changes: IntArray = np.flatnonzero(np.any(keys[1:] != keys[:-1], axis=1)) + 1
+            group_starts: IntArray = np.concatenate(([0], changes))
+            group_stops: IntArray = np.concatenate((changes, [row_count]))
+            for group_start, group_stop in zip(group_starts, group_stops):
+                key: tuple[int, ...] = tuple(int(code) for code in keys[group_start])
+                for depth in range(1, len(key) + 1):
+                    first_row, _ = node_rows.get(key[:depth], (int(group_start), 0))
+                    node_rows[key[:depth]] = (first_row, int(group_stop))
+
+        columns: dict[str, AttributeColumn] = {}
+        for column_name, column_type in CONNECTIVITY_COLUMNS.items():
+            encoded_column: EncodedColumn = encode_column(values_by_column[column_name])
+            if len(encoded_column.lookup) > BITMAP_MAX_VALUES:
+                continue
+            columns[column_name] = create_attribute_column(encoded_column, column_type, row_count)
+
+        print(
+            f"Loaded attribute bitmap index with {len(columns)} columns "
+            f"in {time.perf_counter() - start_time:.2f}s"
+        )
+        return cls(values_by_column["name"], hierarchy_columns, node_rows, columns)
+
+    def has_columns(self, column_names: list[str]) -> bool:
+        return all(column_name in self.columns for column_name in column_names)
+
+    def hierarchy_rows(
+        self, hierarchy_input: HierarchyInput
+    ) -> tuple[int, int, list[tuple[str, str]]]:
+        # The row range of the deepest node named down from the GXP, and the filters left over
+        filters: list[tuple[str, str]] = hierarchy_input.column_filters()
+        key: list[int] = []
+        for column_name, (filter_column, value) in zip(HIERARCHY_COLUMNS, filters):
+            if filter_column != column_name:
+                break
+            code: int | None = self.hierarchy_columns[column_name].lookup.get(value)
+            if code is None:
+                return 0, 0, []
+            key.append(code)
+        if not key:
+            return 0, len(self.names), filters
+        depth: int = len(key)
+        start, stop = self.node_rows.get(tuple(key), (0, 0))
+        return start, stop, filters[depth:]
+
+    def query(self, filters: list[tuple[str, Any]], hierarchy_input: HierarchyInput) -> IntArray:
+        start, stop, hierarchy_filters = self.hierarchy_rows(hierarchy_input)
+
+        row_lists: list[IntArray] = []
+        bitmaps: list[ByteArray] = []
+        for column_name, value in filters:
+            column: AttributeColumn = self.columns[column_name]
+            code: int | None = column.value_code(value)
+            if code is None:
+                return np.zeros(0, dtype=np.int64)
+            row_list: IntArray | None = column.row_lists[code]
+            bitmap: ByteArray | None = column.bitmaps[code]
+            if row_list is not None:
+                row_lists.append(row_list)
+            elif bitmap is not None:
+                bitmaps.append(bitmap)
+
+        rows: IntArray
+        if row_lists:
+            # Start from the rarest value and probe the others
+            row_lists.sort(key=len)
+            first: IntArray = row_lists[0]
+            first_start: int = int(np.searchsorted(first, start))
+            first_stop: int = int(np.searchsorted(first, stop))
+            rows = first[first_start:first_stop]
+            for row_list in row_lists[1:]:
+                rows = np.intersect1d(rows, row_list, assume_unique=True)
+            for bitmap in bitmaps:
+                rows = rows[bitmap_contains(bitmap, rows)]
+        elif bitmaps:
+            rows = bitmap_rows(bitmaps, start, stop)
+        else:
+            rows = np.arange(start, stop, dtype=np.int64)
+
+        for column_name, value in hierarchy_filters:
+            encoded_column: EncodedColumn = self.hierarchy_columns[column_name]
+            hierarchy_code: int | None = encoded_column.lookup.get(value)
+            if hierarchy_code is None:
+                return np.zeros(0, dtype=np.int64)
+            rows = rows[encoded_column.codes[rows] == hierarchy_code]
+        return rows
+
+    def get_names(
+        self, filters: list[tuple[str, Any]], hierarchy_input: HierarchyInput
+    ) -> list[str]:
+        return list(self.names[self.query(filters, hierarchy_input)])
@@ -0,0 +1,137 @@
+import gzip
+import hashlib
+import sqlite3
+from itertools import groupby
+from typing import Any, NamedTuple
+
+import msgspec
+
+from src.common_model import CONNECTIVITY_COLUMNS
+from src.database import GEOMETRY_FIELD_NAME, LevelOfDetail, level_of_detail_table
+from src.geometry import create_feature_dict
+from src.hierarchy import HierarchyInput
+
+
+BUNDLE_TABLE: str = "geojson_bundles"
+
+
+class GeoJSONBundle(NamedTuple):
+    etag: str
+    # Gzip compressed GeoJSON
+    data: bytes
+
+
+def create_bundle(features: list[dict[str, Any]]) -> GeoJSONBundle:
+    geojson: bytes = msgspec.json.encode({"type": "FeatureCollection", "features": features})
+    # A fixed mtime keeps the bytes, and so the ETag, unchanged when a refresh changes nothing
+    data: bytes = gzip.compress(geojson, mtime=0)
+    return GeoJSONBundle(hashlib.sha256(data).hexdigest()[:32], data)
+
+
+def insert_bundle(
+    cursor: sqlite3.Cursor,
+    level_of_detail: LevelOfDetail,
+    gxp_name: str,
+    hv_feeder_code: str,
+    features: list[dict[str, Any]],
+) -> None:
+    bundle: GeoJSONBundle = create_bundle(features)
+    cursor.execute(
+        f"INSERT INTO {BUNDLE_TABLE} VALUES (?, ?, ?, ?, ?);",
+        [level_of_detail.name, gxp_name, hv_feeder_code, bundle.etag, bundle.data],
+    )
+
+
+def create_bundle_table(connection: sqlite3.Connection) -> None:
+    print(f"Creating table `{BUNDLE_TABLE}`")
+    cursor = connection.cursor()
+    # GXP wide bundles have an empty `hv_feeder_code`
+    cursor.execute(f"""
+    CREATE TABLE {BUNDLE_TABLE} (
+        level_of_detail TEXT,
+        gxp_name TEXT,
+        hv_feeder_code TEXT,
+        etag TEXT,
+        data BLOB,
+        PRIMARY KEY (level_of_detail, gxp_name, hv_feeder_code)
+    );
+    """)
+
+    column_names: list[str] = list(CONNECTIVITY_COLUMNS.keys())
+    gxp_index: int = column_names.index("gxp_name")
+    hv_index: int = column_names.index("hv_feeder_code")
+    insert_cursor = connection.cursor()
+    for level_of_detail in LevelOfDetail:
+        print(f"Creating `{level_of_detail.name}` bundles")
+        cursor.execute(f"""
+        SELECT
+            {", ".join(column_names)},
+            AsText({GEOMETRY_FIELD_NAME})
+        FROM {level_of_detail_table(level_of_detail)}
+        WHERE gxp_name IS NOT NULL AND {GEOMETRY_FIELD_NAME} IS NOT NULL
+        ORDER BY gxp_name, hv_feeder_code;
+        """)
+
+        # One pass over the table, each GXP's rows are grouped by HV feeder in turn
+        for gxp_name, gxp_rows in groupby(cursor, key=lambda row: row[gxp_index]):
+            gxp_features: list[dict[str, Any]] = []
+            for hv_feeder_code, hv_rows in groupby(gxp_rows, key=lambda row: row[hv_index]):
+                features: list[dict[str, Any]] = [
+                    create_feature_dict(row[-1], dict(zip(column_names, row[:-1])))
+                    for row in hv_rows
+                ]
+                gxp_features.extend(features)
+                if hv_feeder_code is not None:
+                    insert_bundle(
+                        insert_cursor, level_of_detail, gxp_name, hv_feeder_code, features
+                    )
+            insert_bundle(insert_cursor, level_of_detail, gxp_name, "", gxp_features)
+
+    connection.commit()
+    insert_cursor.close()
+    cursor.close()
+
+
+def bundle_key(hierarchy_input: HierarchyInput) -> tuple[str, str] | None:
+    # Bundles exist for a GXP, and for an HV feeder within one
+    if not hierarchy_input.gxp_name:
+        return None
+    if (
+        hierarchy_input.dtx_code is not None
+        or hierarchy_input.lv_circuit_code is not None
+        or (hierarchy_input.substation_name is not None and not hierarchy_input.hv_feeder_code)
+    ):
+        return None
+    return hierarchy_input.gxp_name, hierarchy_input.hv_feeder_code or ""
+
+
+def get_bundle_etag(
+    connection: sqlite3.Connection, level_of_detail: LevelOfDetail, key: tuple[str, str]
+) -> str | None:
+    cursor = connection.cursor()
+    cursor.execute(
+        f"""
+        SELECT etag FROM {BUNDLE_TABLE}
+        WHERE level_of_detail = ? AND gxp_name = ? AND hv_feeder_code = ?;
+        """,
+        [level_of_detail.name, *key],
+    )
+    row = cursor.fetchone()
+    cursor.close()
+    return row[0] if row is not None else None
+
+
+def get_bundle(
+    connection: sqlite3.Connection, level_of_detail: LevelOfDetail, key: tuple[str, str]
+) -> GeoJSONBundle | None:
+    cursor = connection.cursor()
+    cursor.execute(
+        f"""
+        SELECT etag, data FROM {BUNDLE_TABLE}
+        WHERE level_of_detail = ? AND gxp_name = ? AND hv_feeder_code = ?;
+        """,
+        [level_of_detail.name, *key],
+    )
+    row = cursor.fetchone()
+    cursor.close()
+    return GeoJSONBundle(row[0], row[1]) if row is not None else None
@@ -0,0 +1,159 @@
+import sqlite3
+from typing import Any
+
+from src.database import (
+    EPSG,
+    GEOMETRY_FIELD_NAME,
+    INDEX_COLUMN,
+    LevelOfDetail,
+    create_spatial_index,
+    level_of_detail_table,
+)
+from src.geometry import Bounds, create_feature_dict
+from src.hierarchy import HierarchyInput, HierarchyLevel
+
+
+CLUSTER_TABLE: str = "connectivity_clusters"
+
+CLUSTER_COLUMNS: dict[str, str] = {
+    "hierarchy_level": "TEXT",
+    "name": "TEXT",
+    "gxp_name": "TEXT",
+    "substation_name": "TEXT",
+    "feature_count": "INTEGER",
+    "length_km": "REAL",
+}
+
+
+def cluster_level(hierarchy_input: HierarchyInput) -> HierarchyLevel | None:
+    if (
+        hierarchy_input.substation_name is not None
+        or hierarchy_input.hv_feeder_code is not None
+        or hierarchy_input.dtx_code is not None
+        or hierarchy_input.lv_circuit_code is not None
+    ):
+        return None
+    if hierarchy_input.gxp_name is not None:
+        return HierarchyLevel.SUBSTATION
+    return HierarchyLevel.GXP
+
+
+def create_cluster_table(connection: sqlite3.Connection) -> None:
+    print(f"Creating table `{CLUSTER_TABLE}`")
+    sql: str = f"CREATE TABLE {CLUSTER_TABLE} (\n\t{INDEX_COLUMN} INTEGER PRIMARY KEY"
+    for column_name, column_type in CLUSTER_COLUMNS.items():
+        sql += f",\n\t{column_name} {column_type}"
+    sql += "\n);"
+
+    cursor = connection.cursor()
+    cursor.execute(sql)
+
+    cursor.execute(f"""
+    SELECT AddGeometryColumn(
+        '{CLUSTER_TABLE}',
+        '{GEOMETRY_FIELD_NAME}',
+        {EPSG},
+        'POINT',
+        'XY'
+    );
+    """)
+
+    source_table: str = level_of_detail_table(LevelOfDetail.ALL)
+    representative_point: str = f"""MakePoint(
+            AVG((MbrMinX({GEOMETRY_FIELD_NAME}) + MbrMaxX({GEOMETRY_FIELD_NAME})) / 2),
+            AVG((MbrMinY({GEOMETRY_FIELD_NAME}) + MbrMaxY({GEOMETRY_FIELD_NAME})) / 2),
+            {EPSG}
+        )"""
+
+    print(f"Aggregating `{HierarchyLevel.GXP.name}` clusters")
+    cursor.execute(f"""
+    INSERT INTO {CLUSTER_TABLE} (
+        {", ".join(CLUSTER_COLUMNS.keys())}, {GEOMETRY_FIELD_NAME}
+    )
+    SELECT
+        '{HierarchyLevel.GXP.name}',
+        gxp_name,
+        gxp_name,
+        NULL,
+        COUNT(*),
+        TOTAL(length_km),
+        {representative_point}
+    FROM {source_table}
+    WHERE out_of_order_indicator = 'INS' AND gxp_name IS NOT NULL
+    GROUP BY gxp_name;
+    """)
+
+    print(f"Aggregating `{HierarchyLevel.SUBSTATION.name}` clusters")
+    cursor.execute(f"""
+    INSERT INTO {CLUSTER_TABLE} (
+        {", ".join(CLUSTER_COLUMNS.keys())}, {GEOMETRY_FIELD_NAME}
+    )
+    SELECT
+        '{HierarchyLevel.SUBSTATION.name}',
+        substation_name,
+        gxp_name,
+        substation_name,
+        COUNT(*),
+        TOTAL(length_km),
+        {representative_point}
+    FROM {source_table}
+    WHERE out_of_order_indicator = 'INS'
+    AND gxp_name IS NOT NULL AND substation_name IS NOT NULL
+    GROUP BY gxp_name, substation_name;
+    """)
+
+    connection.commit()
+    cursor.close()
+
+    create_spatial_index(connection, CLUSTER_TABLE)
+
+
+def get_cluster_geojson_from_bounds(
+    connection: sqlite3.Connection, bounds: Bounds, hierarchy_input: HierarchyInput
+) -> dict[str, Any] | None:
+    hierarchy_level: HierarchyLevel | None = cluster_level(hierarchy_input)
+    if hierarchy_level is None:
+        return None
+
+    bounds = bounds.overfit(percent_overfit=50)
+
+    parameters: list[str | float] = [
+        bounds.min_x,
+        bounds.max_x,
+        bounds.min_y,
+        bounds.max_y,
+        hierarchy_level.name,
+    ]
+
+    where_clause, extra_parameters = hierarchy_input.create_sql_where_clause()
+    parameters.extend(extra_parameters)
+
+    cursor = connection.cursor()
+    sql: str = f"""
+    SELECT
+        {", ".join(CLUSTER_COLUMNS.keys())},
+        AsText({GEOMETRY_FIELD_NAME})
+    FROM {CLUSTER_TABLE}
+    JOIN idx_{CLUSTER_TABLE}_{GEOMETRY_FIELD_NAME} AS r
+    ON id = r.pkid
+    WHERE r.xmax >= ? AND r.xmin <= ? AND r.ymax >= ? AND r.ymin <= ?
+    AND hierarchy_level = ?
+    {where_clause};
+    """
+    cursor.execute(sql, parameters)
+
+    rows = cursor.fetchall()
+
+    cursor.close()
+
+    json_output: dict[str, Any] = {}
+    json_output["type"] = "FeatureCollection"
+    features: list[dict[str, Any]] = []
+    for row in rows:
+        properties: dict[str, Any] = dict(zip(CLUSTER_COLUMNS.keys(), row[:-1]))
+        properties["cluster"] = True
+        geometry_wkt: str = row[-1]
+        features.append(create_feature_dict(geometry_wkt, properties))
+    json_output["features"] = features
+
+    return json_output
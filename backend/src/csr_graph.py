@@ -0,0 +1,604 @@
+import heapq
+import json
+import math
+import os
+from bisect import bisect_left
+from enum import Enum, auto
+from pathlib import Path
+from typing import Any, Iterator, Mapping
+
+import numpy as np
+import numpy.typing as npt
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import (
+    breadth_first_order,
+    connected_components,
+    shortest_path,
+)
+
+
+CSR_FORMAT_VERSION: int = 4
+CSR_DIRECTORY_NAME: str = "csr"
+CSR_MANIFEST_FILE_NAME: str = "manifest.json"
+
+CSR_ARRAY_NAMES: list[str] = [
+    "edge_nodes",
+    "indptr",
+    "adjacency_sources",
+    "adjacency_targets",
+    "adjacency_edges",
+    "adjacency_data",
+    "adjacency_lengths",
+    "node_coordinates",
+    "component_labels",
+    "component_node_starts",
+    "component_nodes",
+    "component_edge_starts",
+    "component_edges",
+    "supply_source",
+    "supply_parent_nodes",
+    "supply_parent_edges",
+]
+
+IdArray = npt.NDArray[np.int32]
+OffsetArray = npt.NDArray[np.int64]
+BoolArray = npt.NDArray[np.bool_]
+FloatArray = npt.NDArray[np.float64]
+ByteArray = npt.NDArray[np.uint8]
+
+EARTH_RADIUS_KM: float = 6371.0088
+
+
+class RoutingMode(Enum):
+    HOPS = auto()
+    LENGTH = auto()
+    ASTAR = auto()
+
+    @classmethod
+    def parse_request_args(cls, args: Mapping[str, str]) -> "RoutingMode":
+        routing: str = args.get("routing", "").upper()
+        if routing == "LENGTH":
+            return RoutingMode.LENGTH
+        if routing == "ASTAR":
+            return RoutingMode.ASTAR
+        return RoutingMode.HOPS
+
+
+def great_circle_km(lon_a: float, lat_a: float, lon_b: float, lat_b: float) -> float:
+    phi_a: float = math.radians(lat_a)
+    phi_b: float = math.radians(lat_b)
+    half_chord: float = (
+        math.sin((phi_b - phi_a) / 2) ** 2
+        + math.cos(phi_a) * math.cos(phi_b) * math.sin(math.radians(lon_b - lon_a) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(half_chord)))
+
+
+def great_circle_km_array(start: FloatArray, end: FloatArray) -> FloatArray:
+    # Vectorised `great_circle_km` over rows of longitude and latitude
+    phi_a: FloatArray = np.radians(start[:, 1])
+    phi_b: FloatArray = np.radians(end[:, 1])
+    half_chord: FloatArray = (
+        np.sin((phi_b - phi_a) / 2) ** 2
+        + np.cos(phi_a) * np.cos(phi_b) * np.sin(np.radians(end[:, 0] - start[:, 0]) / 2) ** 2
+    )
+    chords: FloatArray = 2 * EARTH_RADIUS_KM * np.arcsin(np.minimum(1.0, np.sqrt(half_chord)))
+    return chords
+
+
+def heuristic_scale(edge_lengths: FloatArray, chord_lengths: FloatArray) -> float:
+    # A* is only optimal while no edge is shorter than the heuristic's straight line between
+    # its nodes. Lengths and node positions come from the data rather than each other, so the
+    # great circle heuristic is scaled down to the shortest edge, and a graph with a missing
+    # length or node position gets no heuristic at all and is routed with Dijkstra instead.
+    if not (np.isfinite(edge_lengths).all() and np.isfinite(chord_lengths).all()):
+        return 0.0
+    positive: BoolArray = chord_lengths > 0
+    if not positive.any():
+        return 1.0
+    return float(min(1.0, np.min(edge_lengths[positive] / chord_lengths[positive])))
+
+
+class StringTable:
+    # Sorted strings stored as one UTF-8 buffer and offsets, so both can be memory mapped
+    def __init__(self, offsets: OffsetArray, data: ByteArray) -> None:
+        self.offsets = offsets
+        self.data = data
+
+    @classmethod
+    def from_strings(cls, strings: list[str]) -> "StringTable":
+        encoded: list[bytes] = [string.encode("utf-8") for string in sorted(strings)]
+        offsets: OffsetArray = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(value) for value in encoded], out=offsets[1:])
+        data: ByteArray = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+        return cls(offsets, data)
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i: int) -> str:
+        start: int = int(self.offsets[i])
+        stop: int = int(self.offsets[i + 1])
+        return self.data[start:stop].tobytes().decode("utf-8")
+
+    def index(self, string: str) -> int | None:
+        i: int = bisect_left(self, string)
+        if i < len(self) and self[i] == string:
+            return i
+        return None
+
+    def nbytes(self) -> int:
+        return self.offsets.nbytes + self.data.nbytes
+
+
+class CSRGraph:
+    def __init__(
+        self,
+        node_names: StringTable,
+        edge_names: StringTable,
+        arrays: dict[str, Any],
+        heuristic_scale: float = 0.0,
+    ) -> None:
+        self.node_names = node_names
+        self.edge_names = edge_names
+        # Multiplies the A* great circle heuristic, zero when A* would not be optimal
+        self.heuristic_scale = heuristic_scale
+
+        self.edge_nodes: IdArray = arrays["edge_nodes"]
+        self.indptr: IdArray = arrays["indptr"]
+        self.adjacency_sources: IdArray = arrays["adjacency_sources"]
+        self.adjacency_targets: IdArray = arrays["adjacency_targets"]
+        self.adjacency_edges: IdArray = arrays["adjacency_edges"]
+        self.adjacency_data: npt.NDArray[np.int8] = arrays["adjacency_data"]
+        self.adjacency_lengths: FloatArray = arrays["adjacency_lengths"]
+        # Longitude and latitude of each node, NaN where no geometry gave a position
+        self.node_coordinates: FloatArray = arrays["node_coordinates"]
+
+        # Normal-position connected components, with their nodes and edges grouped by label
+        self.component_labels: IdArray = arrays["component_labels"]
+        self.component_node_starts: IdArray = arrays["component_node_starts"]
+        self.component_nodes: IdArray = arrays["component_nodes"]
+        self.component_edge_starts: IdArray = arrays["component_edge_starts"]
+        self.component_edges: IdArray = arrays["component_edges"]
+
+        # Normal-position supply tree rooted at the source, as parent pointers (-1 at the root
+        # and for nodes the source does not reach)
+        self.supply_source: IdArray = arrays["supply_source"]
+        self.supply_parent_nodes: IdArray = arrays["supply_parent_nodes"]
+        self.supply_parent_edges: IdArray = arrays["supply_parent_edges"]
+
+        node_count: int = len(node_names)
+        self.matrix: csr_matrix = csr_matrix(
+            (self.adjacency_data, self.adjacency_targets, self.indptr),
+            shape=(node_count, node_count),
+            copy=False,
+        )
+        self.weighted_matrix: csr_matrix = csr_matrix(
+            (self.adjacency_lengths, self.adjacency_targets, self.indptr),
+            shape=(node_count, node_count),
+            copy=False,
+        )
+
+    @classmethod
+    def from_edges(
+        cls,
+        node_names: list[str],
+        edges_to_nodes: dict[str, tuple[str, str]],
+        source: str | None = None,
+        edge_lengths: dict[str, float] | None = None,
+        node_coordinates: dict[str, tuple[float, float]] | None = None,
+    ) -> "CSRGraph":
+        node_table: StringTable = StringTable.from_strings(node_names)
+        edge_table: StringTable = StringTable.from_strings(list(edges_to_nodes.keys()))
+        node_ids: dict[str, int] = {name: i for i, name in enumerate(sorted(node_names))}
+        edge_nodes: IdArray = np.array(
+            [
+                [node_ids[a], node_ids[b]]
+                for a, b in (edges_to_nodes[edge] for edge in sorted(edges_to_nodes.keys()))
+            ],
+            dtype=np.int32,
+        ).reshape(-1, 2)
+
+        node_count: int = len(node_table)
+        edge_count: int = len(edge_table)
+
+        # Every edge is stored in both directions so traversal can ignore direction
+        sources: IdArray = np.concatenate((edge_nodes[:, 0], edge_nodes[:, 1]))
+        targets: IdArray = np.concatenate((edge_nodes[:, 1], edge_nodes[:, 0]))
+        edges: IdArray = np.tile(np.arange(edge_count, dtype=np.int32), 2)
+        order: OffsetArray = np.argsort(sources, kind="stable")
+
+        indptr: IdArray = np.zeros(node_count + 1, dtype=np.int32)
+        np.cumsum(np.bincount(sources, minlength=node_count), out=indptr[1:])
+
+        arrays: dict[str, Any] = {
+            "edge_nodes": edge_nodes,
+            "indptr": indptr,
+            "adjacency_sources": sources[order],
+            "adjacency_targets": targets[order],
+            "adjacency_edges": edges[order],
+            "adjacency_data": np.ones(len(sources), dtype=np.int8),
+        }
+
+        coordinates: FloatArray = np.full((node_count, 2), np.nan, dtype=np.float64)
+        if node_coordinates is not None:
+            for node_name, coordinate in node_coordinates.items():
+                coordinates[node_ids[node_name]] = coordinate
+        lengths: FloatArray = np.full(edge_count, np.nan, dtype=np.float64)
+        if edge_lengths is not None:
+            for edge_id, edge_name in enumerate(sorted(edges_to_nodes.keys())):
+                length: float | None = edge_lengths.get(edge_name)
+                lengths[edge_id] = length if length is not None else np.nan
+        scale: float = heuristic_scale(
+            lengths,
+            great_circle_km_array(coordinates[edge_nodes[:, 0]], coordinates[edge_nodes[:, 1]]),
+        )
+        lengths = np.nan_to_num(lengths, nan=0.0)
+        arrays["adjacency_lengths"] = lengths[arrays["adjacency_edges"]]
+        arrays["node_coordinates"] = coordinates
+
+        matrix: csr_matrix = csr_matrix(
+            (arrays["adjacency_data"], arrays["adjacency_targets"], indptr),
+            shape=(node_count, node_count),
+        )
+        component_count, labels = connected_components(matrix, directed=False)
+        component_labels: IdArray = labels.astype(np.int32)
+        edge_labels: IdArray = component_labels[edge_nodes[:, 0]]
+
+        arrays["component_labels"] = component_labels
+        arrays["component_node_starts"] = group_starts(component_labels, component_count)
+        arrays["component_nodes"] = np.argsort(component_labels, kind="stable").astype(np.int32)
+        arrays["component_edge_starts"] = group_starts(edge_labels, component_count)
+        arrays["component_edges"] = np.argsort(edge_labels, kind="stable").astype(np.int32)
+
+        source_id: int | None = node_ids.get(source) if source is not None else None
+        parent_nodes: IdArray = np.full(node_count, -1, dtype=np.int32)
+        parent_edges: IdArray = np.full(node_count, -1, dtype=np.int32)
+        if source_id is not None:
+            _, predecessors = breadth_first_order(
+                matrix, source_id, directed=True, return_predecessors=True
+            )
+            parent_nodes = np.where(predecessors < 0, -1, predecessors).astype(np.int32)
+            # The first edge from each node back to its parent becomes the tree edge
+            matches: BoolArray = (
+                parent_nodes[arrays["adjacency_sources"]] == arrays["adjacency_targets"]
+            )
+            child_nodes, first_match = np.unique(
+                arrays["adjacency_sources"][matches], return_index=True
+            )
+            parent_edges[child_nodes] = arrays["adjacency_edges"][matches][first_match]
+
+        arrays["supply_source"] = np.array([-1 if source_id is None else source_id], dtype=np.int32)
+        arrays["supply_parent_nodes"] = parent_nodes
+        arrays["supply_parent_edges"] = parent_edges
+        return cls(node_table, edge_table, arrays, scale)
+
+    def node_id(self, node: str) -> int | None:
+        return self.node_names.index(node)
+
+    def has_node(self, node: str) -> bool:
+        return self.node_id(node) is not None
+
+    def size_bytes(self) -> int:
+        array_bytes: int = (
+            self.edge_nodes.nbytes
+            + self.indptr.nbytes
+            + self.adjacency_sources.nbytes
+            + self.adjacency_targets.nbytes
+            + self.adjacency_edges.nbytes
+            + self.adjacency_data.nbytes
+            + self.adjacency_lengths.nbytes
+            + self.node_coordinates.nbytes
+            + self.component_labels.nbytes
+            + self.component_node_starts.nbytes
+            + self.component_nodes.nbytes
+            + self.component_edge_starts.nbytes
+            + self.component_edges.nbytes
+            + self.supply_source.nbytes
+            + self.supply_parent_nodes.nbytes
+            + self.supply_parent_edges.nbytes
+        )
+        return array_bytes + self.node_names.nbytes() + self.edge_names.nbytes()
+
+    def edge_mask(self, edges_to_exclude: list[str]) -> BoolArray | None:
+        excluded: list[int] = []
+        for edge in edges_to_exclude:
+            edge_id: int | None = self.edge_names.index(edge)
+            if edge_id is not None:
+                excluded.append(edge_id)
+        if not excluded:
+            return None
+        mask: BoolArray = np.ones(len(self.edge_names), dtype=np.bool_)
+        mask[excluded] = False
+        return mask
+
+    def create_matrix(self, edge_mask: BoolArray | None, weighted: bool = False) -> csr_matrix:
+        if edge_mask is None:
+            return self.weighted_matrix if weighted else self.matrix
+        node_count: int = len(self.node_names)
+        allowed: BoolArray = edge_mask[self.adjacency_edges]
+        targets: IdArray = self.adjacency_targets[allowed]
+        indptr: IdArray = np.zeros(node_count + 1, dtype=np.int32)
+        np.cumsum(
+            np.bincount(self.adjacency_sources[allowed], minlength=node_count),
+            out=indptr[1:],
+        )
+        data: npt.NDArray[Any] = (
+            self.adjacency_lengths[allowed] if weighted else np.ones(len(targets), dtype=np.int8)
+        )
+        # Explicit zeros are kept, scipy treats them as zero length edges
+        return csr_matrix((data, targets, indptr), shape=(node_count, node_count))
+
+    def breadth_first(self, node_id: int, edge_mask: BoolArray | None) -> tuple[IdArray, IdArray]:
+        order, predecessors = breadth_first_order(
+            self.create_matrix(edge_mask), node_id, directed=True, return_predecessors=True
+        )
+        return order, predecessors
+
+    def predecessors(
+        self, node_id: int, edge_mask: BoolArray | None, routing: RoutingMode
+    ) -> IdArray:
+        if routing == RoutingMode.HOPS:
+            _, predecessors = self.breadth_first(node_id, edge_mask)
+            return predecessors
+        _, weighted_predecessors = shortest_path(
+            self.create_matrix(edge_mask, weighted=True),
+            method="D",
+            directed=True,
+            indices=node_id,
+            return_predecessors=True,
+        )
+        return weighted_predecessors
+
+    def distances(
+        self, node_id: int, edge_mask: BoolArray | None, routing: RoutingMode = RoutingMode.HOPS
+    ) -> FloatArray:
+        weighted: bool = routing != RoutingMode.HOPS
+        distances: FloatArray = shortest_path(
+            self.create_matrix(edge_mask, weighted),
+            directed=True,
+            unweighted=not weighted,
+            indices=node_id,
+        )
+        return distances
+
+    def heuristic_km(self, node_id: int, target_id: int) -> float:
+        lon_a, lat_a = self.node_coordinates[node_id]
+        lon_b, lat_b = self.node_coordinates[target_id]
+        if math.isnan(lon_a) or math.isnan(lon_b):
+            return 0.0
+        return self.heuristic_scale * great_circle_km(
+            float(lon_a), float(lat_a), float(lon_b), float(lat_b)
+        )
+
+    def astar(
+        self, id_a: int, id_b: int, edge_mask: BoolArray | None
+    ) -> tuple[list[int] | None, int]:
+        # Returns the edge ids of the path along with how many nodes were expanded
+        distances: dict[int, float] = {id_a: 0.0}
+        previous_edges: dict[int, tuple[int, int]] = {}
+        expanded: set[int] = set()
+        queue: list[tuple[float, float, int]] = [(self.heuristic_km(id_a, id_b), 0.0, id_a)]
+        while queue:
+            _, distance, node_id = heapq.heappop(queue)
+            if node_id in expanded:
+                continue
+            expanded.add(node_id)
+            if node_id == id_b:
+                break
+
+            start: int = int(self.indptr[node_id])
+            stop: int = int(self.indptr[node_id + 1])
+            neighbours: list[int] = self.adjacency_targets[start:stop].tolist()
+            edges: list[int] = self.adjacency_edges[start:stop].tolist()
+            lengths: list[float] = self.adjacency_lengths[start:stop].tolist()
+            for neighbour, edge, length in zip(neighbours, edges, lengths):
+                if edge_mask is not None and not edge_mask[edge]:
+                    continue
+                neighbour_distance: float = distance + length
+                if neighbour_distance < distances.get(neighbour, math.inf):
+                    distances[neighbour] = neighbour_distance
+                    previous_edges[neighbour] = (node_id, edge)
+                    estimate: float = neighbour_distance + self.heuristic_km(neighbour, id_b)
+                    heapq.heappush(queue, (estimate, neighbour_distance, neighbour))
+
+        if id_b not in expanded:
+            return None, len(expanded)
+        edge_path: list[int] = []
+        current: int = id_b
+        while current != id_a:
+            current, edge = previous_edges[current]
+            edge_path.append(edge)
+        edge_path.reverse()
+        return edge_path, len(expanded)
+
+    def reachable(self, node_id: int, edge_mask: BoolArray | None) -> tuple[IdArray, IdArray]:
+        component: int = int(self.component_labels[node_id])
+        node_start: int = int(self.component_node_starts[component])
+        node_stop: int = int(self.component_node_starts[component + 1])
+        edge_start: int = int(self.component_edge_starts[component])
+        edge_stop: int = int(self.component_edge_starts[component + 1])
+        nodes: IdArray = self.component_nodes[node_start:node_stop]
+        edges: IdArray = self.component_edges[edge_start:edge_stop]
+        if edge_mask is None or edge_mask[edges].all():
+            return nodes, edges
+
+        # Only the component holding the excluded edges is split, the rest of the graph is
+        # untouched. Component nodes are sorted, so searchsorted relabels them from zero.
+        allowed: IdArray = edges[edge_mask[edges]]
+        local_edge_nodes: OffsetArray = np.searchsorted(nodes, self.edge_nodes[allowed])
+        local_count: int = len(nodes)
+        matrix: csr_matrix = csr_matrix(
+            (
+                np.ones(len(allowed), dtype=np.int8),
+                (local_edge_nodes[:, 0], local_edge_nodes[:, 1]),
+            ),
+            shape=(local_count, local_count),
+        )
+        _, local_labels = connected_components(matrix, directed=False)
+        start_label: int = int(local_labels[np.searchsorted(nodes, node_id)])
+        return (
+            nodes[local_labels == start_label],
+            allowed[local_labels[local_edge_nodes[:, 0]] == start_label],
+        )
+
+    def shortest_path(
+        self,
+        node_a: str,
+        node_b: str,
+        edge_mask: BoolArray | None = None,
+        routing: RoutingMode = RoutingMode.HOPS,
+    ) -> list[str] | None:
+        id_a: int | None = self.node_id(node_a)
+        id_b: int | None = self.node_id(node_b)
+        if id_a is None or id_b is None:
+            return None
+        if self.component_labels[id_a] != self.component_labels[id_b]:
+            return None
+
+        if routing == RoutingMode.ASTAR and self.heuristic_scale > 0:
+            astar_path, _ = self.astar(id_a, id_b, edge_mask)
+            if astar_path is None:
+                return None
+            return [self.edge_names[edge] for edge in astar_path]
+
+        predecessors: IdArray = self.predecessors(id_a, edge_mask, routing)
+        if id_a != id_b and predecessors[id_b] < 0:
+            return None
+
+        weighted: bool = routing != RoutingMode.HOPS
+        edge_path: list[str] = []
+        current: int = id_b
+        while current != id_a:
+            previous: int = int(predecessors[current])
+            edge: int = self.connecting_edge(current, previous, edge_mask, weighted)
+            edge_path.append(self.edge_names[edge])
+            current = previous
+        edge_path.reverse()
+        return edge_path
+
+    def connecting_edge(
+        self,
+        node_id: int,
+        neighbour_id: int,
+        edge_mask: BoolArray | None,
+        weighted: bool = False,
+    ) -> int:
+        # Picks the shortest of any parallel edges when weighted, otherwise the first
+        found_edge: int | None = None
+        found_length: float = math.inf
+        start: int = int(self.indptr[node_id])
+        stop: int = int(self.indptr[node_id + 1])
+        for position in range(start, stop):
+            if self.adjacency_targets[position] != neighbour_id:
+                continue
+            edge: int = int(self.adjacency_edges[position])
+            if edge_mask is not None and not edge_mask[edge]:
+                continue
+            if not weighted:
+                return edge
+            length: float = float(self.adjacency_lengths[position])
+            if found_edge is None or length < found_length:
+                found_edge, found_length = edge, length
+        if found_edge is None:
+            raise KeyError(f"No edge between nodes {node_id} and {neighbour_id}")
+        return found_edge
+
+    def upstream(self, node: str) -> list[tuple[str, str]] | None:
+        # Follows parent pointers from the node back to the source, as (edge, node) hops
+        node_id: int | None = self.node_id(node)
+        if node_id is None:
+            return None
+        source_id: int = int(self.supply_source[0])
+        if node_id != source_id and self.supply_parent_nodes[node_id] < 0:
+            return None
+
+        hops: list[tuple[str, str]] = []
+        current: int = node_id
+        while current != source_id:
+            edge: int = int(self.supply_parent_edges[current])
+            current = int(self.supply_parent_nodes[current])
+            hops.append((self.edge_names[edge], self.node_names[current]))
+        return hops
+
+    def flood_fill(self, node: str, edge_mask: BoolArray | None = None) -> Iterator[str]:
+        # Names are decoded as they are consumed, so a page only decodes its own edges
+        node_id: int | None = self.node_id(node)
+        if node_id is None:
+            return
+        _, edges = self.reachable(node_id, edge_mask)
+        for edge in edges:
+            yield self.edge_names[edge]
+
+
+def group_starts(labels: IdArray, group_count: int) -> IdArray:
+    starts: IdArray = np.zeros(group_count + 1, dtype=np.int32)
+    np.cumsum(np.bincount(labels, minlength=group_count), out=starts[1:])
+    return starts
+
+
+def replace_file(path: Path, data: Any) -> None:
+    # Write then rename, so processes with the old file mapped keep reading the old inode
+    temporary_path: Path = path.with_name(path.name + ".tmp")
+    with open(temporary_path, "wb") as f:
+        if isinstance(data, np.ndarray):
+            np.save(f, data)
+        else:
+            f.write(data)
+    os.replace(temporary_path, path)
+
+
+def write_csr_graph(csr_graph: CSRGraph, path: Path) -> None:
+    path = path / CSR_DIRECTORY_NAME
+    os.makedirs(path, exist_ok=True)
+
+    arrays: dict[str, Any] = {
+        array_name: getattr(csr_graph, array_name) for array_name in CSR_ARRAY_NAMES
+    }
+    arrays |= {
+        "node_offsets": csr_graph.node_names.offsets,
+        "edge_offsets": csr_graph.edge_names.offsets,
+    }
+    for array_name, array in arrays.items():
+        replace_file(path / f"{array_name}.npy", array)
+
+    replace_file(path / "node_names.bin", csr_graph.node_names.data.tobytes())
+    replace_file(path / "edge_names.bin", csr_graph.edge_names.data.tobytes())
+
+    manifest: dict[str, int | float] = {
+        "format_version": CSR_FORMAT_VERSION,
+        "node_count": len(csr_graph.node_names),
+        "edge_count": len(csr_graph.edge_names),
+        "heuristic_scale": csr_graph.heuristic_scale,
+    }
+    replace_file(path / CSR_MANIFEST_FILE_NAME, json.dumps(manifest).encode("utf-8"))
+
+
+def map_bytes(path: Path) -> ByteArray:
+    if os.path.getsize(path) == 0:
+        return np.zeros(0, dtype=np.uint8)
+    return np.memmap(path, dtype=np.uint8, mode="r")
+
+
+def read_csr_graph(path: Path) -> CSRGraph:
+    path = path / CSR_DIRECTORY_NAME
+    with open(path / CSR_MANIFEST_FILE_NAME, "r") as f:
+        manifest: dict[str, int | float] = json.load(f)
+    if manifest["format_version"] != CSR_FORMAT_VERSION:
+        raise ValueError(
+            f"Graph `{path}` has format version {manifest['format_version']}, "
+            f"expected {CSR_FORMAT_VERSION}. Refresh the databases."
+        )
+
+    arrays: dict[str, Any] = {
+        array_name: np.load(path / f"{array_name}.npy", mmap_mode="r")
+        for array_name in CSR_ARRAY_NAMES
+    }
+    node_names: StringTable = StringTable(
+        np.load(path / "node_offsets.npy", mmap_mode="r"), map_bytes(path / "node_names.bin")
+    )
+    edge_names: StringTable = StringTable(
+        np.load(path / "edge_offsets.npy", mmap_mode="r"), map_bytes(path / "edge_names.bin")
+    )
+    # Graphs written before the scale was recorded are routed with Dijkstra
+    return CSRGraph(node_names, edge_names, arrays, float(manifest.get("heuristic_scale", 0.0)))
@@ -14,6 +14,14 @@ EPSG: int = 4326
 INDEX_COLUMN: str = "id"
 GEOMETRY_FIELD_NAME: str = "geometry"
 
+SPATIAL_PARTITION_TABLE: str = "spatial_partitions"
+
+# R-tree names by level of detail table and GXP name
+SpatialPartitions = dict[tuple[str, str], str]
+
+# Pages are read straight from the OS page cache, so every connection shares the warm pages
+DATABASE_MMAP_SIZE_BYTES: int = 2 * 1024**3
+
 
 class LevelOfDetail(Enum):
     GXP = auto()
@@ -150,6 +158,113 @@ def create_spatial_index(connection: sqlite3.Connection, table_name: str) -> Non
     cursor.close()
 
 
+def create_name_index(connection: sqlite3.Connection, table_name: str) -> None:
+    print(f"Creating name index for `{table_name}`")
+    cursor = connection.cursor()
+    cursor.execute(f"CREATE INDEX idx_{table_name}_name ON {table_name} (name);")
+    connection.commit()
+    cursor.close()
+
+
+def create_object_id_index(connection: sqlite3.Connection, table_name: str) -> None:
+    print(f"Creating object id index for `{table_name}`")
+    cursor = connection.cursor()
+    cursor.execute(f"CREATE INDEX idx_{table_name}_object_id ON {table_name} (object_id);")
+    connection.commit()
+    cursor.close()
+
+
+def create_spatial_partition_table(connection: sqlite3.Connection) -> None:
+    print(f"Creating table `{SPATIAL_PARTITION_TABLE}`")
+    cursor = connection.cursor()
+    cursor.execute(f"""
+    CREATE TABLE {SPATIAL_PARTITION_TABLE} (
+        table_name TEXT,
+        gxp_name TEXT,
+        rtree_name TEXT,
+        feature_count INTEGER,
+        PRIMARY KEY (table_name, gxp_name)
+    );
+    """)
+    cursor.close()
+
+
+def create_partitioned_spatial_indexes(connection: sqlite3.Connection, table_name: str) -> None:
+    cursor = connection.cursor()
+    cursor.execute(f"""
+    SELECT DISTINCT gxp_name
+    FROM {table_name}
+    WHERE gxp_name IS NOT NULL
+    ORDER BY gxp_name;
+    """)
+    gxp_names: list[str] = [row[0] for row in cursor.fetchall()]
+
+    for i, gxp_name in enumerate(gxp_names):
+        rtree_name: str = f"idx_{table_name}_gxp_{i}"
+        print(f"Creating spatial index partition for `{table_name}` GXP `{gxp_name}`")
+        cursor.execute(f"""
+        CREATE VIRTUAL TABLE {rtree_name} USING rtree(pkid, xmin, xmax, ymin, ymax);
+        """)
+        cursor.execute(
+            f"""
+        INSERT INTO {rtree_name} (pkid, xmin, xmax, ymin, ymax)
+        SELECT r.pkid, r.xmin, r.xmax, r.ymin, r.ymax
+        FROM idx_{table_name}_{GEOMETRY_FIELD_NAME} AS r
+        JOIN {table_name}
+        ON {INDEX_COLUMN} = r.pkid
+        WHERE gxp_name = ?;
+        """,
+            [gxp_name],
+        )
+        feature_count: int = cursor.rowcount
+        cursor.execute(
+            f"INSERT INTO {SPATIAL_PARTITION_TABLE} VALUES (?, ?, ?, ?);",
+            [table_name, gxp_name, rtree_name, feature_count],
+        )
+
+    connection.commit()
+    cursor.close()
+
+
+def get_spatial_index_partition(
+    connection: sqlite3.Connection, table_name: str, gxp_name: str
+) -> str | None:
+    cursor = connection.cursor()
+    try:
+        cursor.execute(
+            f"""
+        SELECT rtree_name
+        FROM {SPATIAL_PARTITION_TABLE}
+        WHERE table_name = ? AND gxp_name = ?;
+        """,
+            [table_name, gxp_name],
+        )
+    except sqlite3.OperationalError:
+        cursor.close()
+        return None
+    row: tuple[str] | None = cursor.fetchone()
+    cursor.close()
+    if row is None:
+        return None
+    return row[0]
+
+
+def load_spatial_partitions(connection: sqlite3.Connection) -> SpatialPartitions:
+    cursor = connection.cursor()
+    try:
+        cursor.execute(f"SELECT table_name, gxp_name, rtree_name FROM {SPATIAL_PARTITION_TABLE};")
+    except sqlite3.OperationalError:
+        # Databases built before partitioning only have the whole table's spatial index
+        print(f"Table `{SPATIAL_PARTITION_TABLE}` not found, map queries will not be partitioned")
+        cursor.close()
+        return {}
+    spatial_partitions: SpatialPartitions = {
+        (row[0], row[1]): row[2] for row in cursor.fetchall()
+    }
+    cursor.close()
+    return spatial_partitions
+
+
 def create_and_populate_table(
     connection: sqlite3.Connection, table_name: str, contents: GeoDataFrame
 ) -> None:
@@ -167,15 +282,20 @@ def create_level_of_detail_table(
         connectivity, level_of_detail
     )
     create_and_populate_table(connection, table_name, level_of_detail_connectivity)
+    create_partitioned_spatial_indexes(connection, table_name)
+    create_name_index(connection, table_name)
+    create_object_id_index(connection, table_name)
 
 
 def create_all_tables(connection: sqlite3.Connection, connectivity: GeoDataFrame) -> None:
     init_new_db_spatialite(connection)
+    create_spatial_partition_table(connection)
     for level_of_detail in LevelOfDetail:
         create_level_of_detail_table(connection, connectivity, level_of_detail)
 
 
 def create_connection(db_path: str | Path) -> sqlite3.Connection:
     connection = sqlite3.connect(db_path)
+    connection.execute(f"PRAGMA mmap_size = {DATABASE_MMAP_SIZE_BYTES};")
     load_spatialite(connection)
     return connection
@@ -0,0 +1,97 @@
+import sqlite3
+from typing import Any
+
+from src.common_model import CONNECTIVITY_COLUMNS
+from src.database import LevelOfDetail, level_of_detail_table
+from src.hierarchy import HIERARCHY_COLUMNS, HierarchyInput
+
+
+FACET_TABLE: str = "column_facets"
+# Columns with more distinct values than this, like names and ids, are not worth a facet
+FACET_MAX_VALUES: int = 256
+
+
+def create_facet_table(connection: sqlite3.Connection) -> None:
+    print(f"Creating table `{FACET_TABLE}`")
+    source_table: str = level_of_detail_table(LevelOfDetail.ALL)
+    cursor = connection.cursor()
+
+    sql: str = f"CREATE TABLE {FACET_TABLE} (\n\tdepth INTEGER"
+    for column_name in HIERARCHY_COLUMNS:
+        sql += f",\n\t{column_name} TEXT"
+    # The value column has no type so values keep the type, and sort order, of their column
+    sql += ",\n\tcolumn_name TEXT,\n\tvalue,\n\tvalue_count INTEGER\n);"
+    cursor.execute(sql)
+
+    for column in CONNECTIVITY_COLUMNS.keys():
+        cursor.execute(f"SELECT COUNT(DISTINCT {column}) FROM {source_table};")
+        distinct_count: int = cursor.fetchone()[0]
+        if distinct_count > FACET_MAX_VALUES:
+            print(f"Skipping facets for `{column}`, {distinct_count} distinct values")
+            continue
+
+        print(f"Creating facets for `{column}`")
+        # Depth n holds the value counts under every combination of the first n hierarchy
+        # columns, NULLs included, so any filter on those columns is a sum over its rows
+        for depth in range(len(HIERARCHY_COLUMNS) + 1):
+            parent_columns: list[str] = HIERARCHY_COLUMNS[:depth]
+            group_columns: str = ", ".join(parent_columns + [column])
+            insert_columns: str = ", ".join(parent_columns + ["column_name", "value"])
+            select_columns: str = ", ".join(parent_columns + [f"'{column}'", column])
+            cursor.execute(f"""
+            INSERT INTO {FACET_TABLE} (depth, {insert_columns}, value_count)
+            SELECT {depth}, {select_columns}, COUNT(*)
+            FROM {source_table}
+            GROUP BY {group_columns};
+            """)
+
+    cursor.execute(f"""
+    CREATE INDEX idx_{FACET_TABLE}_column ON {FACET_TABLE} (
+        column_name, depth, {", ".join(HIERARCHY_COLUMNS)}
+    );
+    """)
+    connection.commit()
+    cursor.close()
+
+
+def facet_depth(hierarchy_input: HierarchyInput) -> int:
+    depth: int = 0
+    for column_name, _ in hierarchy_input.column_filters():
+        depth = max(depth, HIERARCHY_COLUMNS.index(column_name) + 1)
+    return depth
+
+
+def get_facet_value_counts(
+    connection: sqlite3.Connection, column: str, hierarchy_input: HierarchyInput
+) -> list[tuple[Any, int]] | None:
+    where_statement, parameters = hierarchy_input.create_sql_where_clause()
+    sql: str = f"""
+    SELECT
+        value, SUM(value_count)
+    FROM {FACET_TABLE}
+    WHERE column_name = ? AND depth = ?{where_statement}
+    GROUP BY value
+    ORDER BY value;
+    """
+
+    cursor = connection.cursor()
+    try:
+        cursor.execute(sql, [column, facet_depth(hierarchy_input), *parameters])
+    except sqlite3.OperationalError:
+        # Databases built before facets existed are grouped from the connectivity table
+        print(f"Table `{FACET_TABLE}` not found, column values will be queried from SQL")
+        cursor.close()
+        return None
+    value_counts: list[tuple[Any, int]] = [(row[0], row[1]) for row in cursor.fetchall()]
+
+    if not value_counts:
+        # An empty scope, or a column without facets which the caller has to scan for
+        cursor.execute(
+            f"SELECT 1 FROM {FACET_TABLE} WHERE column_name = ? AND depth = 0 LIMIT 1;", [column]
+        )
+        if cursor.fetchone() is None:
+            cursor.close()
+            return None
+
+    cursor.close()
+    return value_counts
@@ -1,15 +1,30 @@
+import math
 import sqlite3
-from typing import Any, NamedTuple, Self
+from typing import TYPE_CHECKING, Any, Iterator, NamedTuple, Self
 
 from src.common_model import CONNECTIVITY_COLUMNS
 from src.database import (
     LevelOfDetail,
+    SpatialPartitions,
     level_of_detail_table,
     GEOMETRY_FIELD_NAME,
     create_connection,
+    get_spatial_index_partition,
 )
 from src.hierarchy import HierarchyInput
 
+if TYPE_CHECKING:
+    from src.spatial_index import SpatialIndexEngine
+
+
+TILE_SIZE: int = 256
+# Zoom levels past this are clamped, they are deeper than any map goes and 2**zoom soon
+# overflows or underflows
+MAX_ZOOM: float = 30.0
+MIN_FEATURE_PIXELS: float = 1.0
+# Kept well under SQLite's limit on bound parameters
+NAME_BATCH_SIZE: int = 500
+
 
 class Bounds(NamedTuple):
     min_x: float
@@ -33,6 +48,21 @@ class Bounds(NamedTuple):
         )
 
 
+def resolution_from_zoom(zoom_level: float) -> float:
+    return 360 / (TILE_SIZE * 2**zoom_level)
+
+
+def clamp_zoom(zoom: float | None) -> float | None:
+    # Zoom comes straight from request args, anything not finite is treated as missing
+    if zoom is None or not math.isfinite(zoom):
+        return None
+    return max(0.0, min(zoom, MAX_ZOOM))
+
+
+def zoom_from_resolution(resolution: float) -> float:
+    return math.log2(360 / (TILE_SIZE * resolution))
+
+
 def level_of_detail_from_zoom(zoom_level: float) -> LevelOfDetail:
     if zoom_level > 15:
         return LevelOfDetail.ALL
@@ -50,6 +80,23 @@ def get_level_of_detail(bounds: Bounds) -> LevelOfDetail:
     return LevelOfDetail.GXP
 
 
+def get_spatial_index_name(
+    connection: sqlite3.Connection,
+    table_name: str,
+    hierarchy_input: HierarchyInput,
+    spatial_partitions: SpatialPartitions | None = None,
+) -> str:
+    # Partitions loaded at startup are looked up in memory, otherwise they are queried
+    rtree_name: str | None = None
+    if hierarchy_input.gxp_name is not None and spatial_partitions is not None:
+        rtree_name = spatial_partitions.get((table_name, hierarchy_input.gxp_name))
+    elif hierarchy_input.gxp_name is not None:
+        rtree_name = get_spatial_index_partition(connection, table_name, hierarchy_input.gxp_name)
+    if rtree_name is None:
+        rtree_name = f"idx_{table_name}_{GEOMETRY_FIELD_NAME}"
+    return rtree_name
+
+
 def create_geometry_dict(geometry_wkt: str) -> dict[str, Any]:
     if geometry_wkt[0] == "P":
         coord_string: str = geometry_wkt[len("POINT(") : len(geometry_wkt) - 1]  # noqa[E203]
@@ -69,41 +116,124 @@ def create_feature_dict(geometry_wkt: str, properties: dict[str, Any]) -> dict[s
     return {"type": "Feature", "geometry": geometry_dict, "properties": properties}
 
 
+def get_features_by_name(
+    connection: sqlite3.Connection,
+    names: list[str],
+    attribute_columns: list[str],
+    simplify_tolerance: float | None = None,
+) -> Iterator[dict[str, Any]]:
+    table_name: str = level_of_detail_table(LevelOfDetail.ALL)
+    geometry: str = GEOMETRY_FIELD_NAME
+    if simplify_tolerance is not None:
+        geometry = f"SimplifyPreserveTopology({GEOMETRY_FIELD_NAME}, {float(simplify_tolerance)})"
+    property_columns: list[str] = ["name"]
+    for column in attribute_columns:
+        if column in CONNECTIVITY_COLUMNS and column not in property_columns:
+            property_columns.append(column)
+
+    cursor = connection.cursor()
+    for start in range(0, len(names), NAME_BATCH_SIZE):
+        stop: int = start + NAME_BATCH_SIZE
+        batch: list[str] = names[start:stop]
+        sql: str = f"""
+        SELECT
+            {", ".join(property_columns)},
+            AsText({geometry})
+        FROM {table_name}
+        WHERE name IN ({", ".join("?" for _ in batch)});
+        """
+        cursor.execute(sql, batch)
+
+        rows_by_name: dict[str, list[Any]] = {}
+        for row in cursor.fetchall():
+            rows_by_name.setdefault(row[0], []).append(row)
+
+        # Features are yielded in the order of `names`, so traces keep their path order
+        for name in batch:
+            for row in rows_by_name.get(name, []):
+                geometry_wkt: str | None = row[-1]
+                if geometry_wkt is None:
+                    continue
+                yield create_feature_dict(geometry_wkt, dict(zip(property_columns, row[:-1])))
+    cursor.close()
+
+
 def get_geojson_from_bounds(
     connection: sqlite3.Connection,
     bounds: Bounds,
     attribute_column: str | None,
     hierarchy_input: HierarchyInput,
     level_of_detail: LevelOfDetail | None = None,
+    zoom: float | None = None,
+    resolution: float | None = None,
+    min_feature_pixels: float = MIN_FEATURE_PIXELS,
+    spatial_index: "SpatialIndexEngine | None" = None,
+    spatial_partitions: SpatialPartitions | None = None,
 ) -> dict[str, Any] | None:
+    zoom = clamp_zoom(zoom)
+    if resolution is None and zoom is not None:
+        resolution = resolution_from_zoom(zoom)
+    if resolution is not None and not (math.isfinite(resolution) and resolution > 0):
+        # No zoom level has such a resolution, nothing can be drawn at it
+        return {"type": "FeatureCollection", "features": []}
     if level_of_detail is None:
-        level_of_detail = get_level_of_detail(bounds)
+        if resolution is not None:
+            level_of_detail = level_of_detail_from_zoom(zoom_from_resolution(resolution))
+        else:
+            level_of_detail = get_level_of_detail(bounds)
     table_name: str = level_of_detail_table(level_of_detail)
-    cursor = connection.cursor()
 
     bounds = bounds.overfit(percent_overfit=50)
 
-    parameters: list[str | float] = [bounds.min_x, bounds.max_x, bounds.min_y, bounds.max_y]
-
     if not attribute_column:
         attribute_column = "is_in_sub"
 
     if attribute_column not in CONNECTIVITY_COLUMNS:
         return None
 
+    min_size_x: float = 0
+    min_size_y: float = 0
+    if resolution is not None and min_feature_pixels > 0:
+        latitude: float = math.radians((bounds.min_y + bounds.max_y) / 2)
+        min_size_x = min_feature_pixels * resolution
+        min_size_y = min_feature_pixels * resolution * math.cos(latitude)
+
+    if spatial_index is not None:
+        return spatial_index.get_geojson(
+            level_of_detail, bounds, attribute_column, hierarchy_input, min_size_x, min_size_y
+        )
+
+    parameters: list[str | float] = [bounds.min_x, bounds.max_x, bounds.min_y, bounds.max_y]
+
     where_clause, extra_parameters = hierarchy_input.create_sql_where_clause()
     parameters.extend(extra_parameters)
 
+    culling_clause: str = ""
+    if min_size_x > 0 or min_size_y > 0:
+        # Points are never culled, their R-tree extent is only float32 rounding
+        culling_clause = f"""AND (
+        r.xmax - r.xmin >= ? OR r.ymax - r.ymin >= ?
+        OR GeometryType({GEOMETRY_FIELD_NAME}) = 'POINT'
+    )"""
+        parameters.extend([min_size_x, min_size_y])
+
+    rtree_name: str = get_spatial_index_name(
+        connection, table_name, hierarchy_input, spatial_partitions
+    )
+
+    cursor = connection.cursor()
+
     sql: str = f"""
     SELECT
         name,
         {attribute_column},
         AsText({GEOMETRY_FIELD_NAME})
     FROM {table_name}
-    JOIN idx_{table_name}_{GEOMETRY_FIELD_NAME} AS r
+    JOIN {rtree_name} AS r
     ON id = r.pkid
     WHERE r.xmax >= ? AND r.xmin <= ? AND r.ymax >= ? AND r.ymin <= ?
-    {where_clause};
+    {where_clause}
+    {culling_clause};
     """
     cursor.execute(sql, parameters)
 
@@ -1,12 +1,43 @@
+import math
 import pickle
 import sqlite3
+from enum import Enum, auto
 from pathlib import Path
-from typing import NamedTuple
+from typing import TYPE_CHECKING, Iterator, NamedTuple
+
+import numpy as np
+from networkx import (
+    Graph,
+    NetworkXNoPath,
+    NodeNotFound,
+    MultiGraph,
+    astar_path,
+    get_node_attributes,
+    node_connected_component,
+    restricted_view,
+    shortest_path,
+)
+
+from src.csr_graph import (
+    CSR_DIRECTORY_NAME,
+    CSRGraph,
+    RoutingMode,
+    FloatArray,
+    great_circle_km,
+    heuristic_scale,
+    read_csr_graph,
+)
+from src.database import GEOMETRY_FIELD_NAME, LevelOfDetail, level_of_detail_table
+from src.hierarchy import HierarchyInput
+from src.network_graph import NetworkIndex, network_flood_fill, network_shortest_path
 
-from networkx import NetworkXNoPath, NodeNotFound, MultiGraph, dfs_edges, shortest_path
+if TYPE_CHECKING:
+    from src.graph_cache import GraphCache
 
-from src.database import LevelOfDetail, level_of_detail_table
-from src.hierarchy import HierarchyInput
+
+class GraphEngine(Enum):
+    NETWORKX = auto()
+    CSR = auto()
 
 
 class ConnectivityGraph(NamedTuple):
@@ -32,15 +63,60 @@ def read_connectivity_graph(path: Path) -> ConnectivityGraph:
     return ConnectivityGraph(graph, nodes_to_edges)
 
 
+def connectivity_to_csr_graph(
+    connectivity_graph: ConnectivityGraph, source: str | None = None
+) -> CSRGraph:
+    graph: MultiGraph = connectivity_graph.graph  # type: ignore[type-arg]
+    edge_lengths: dict[str, float] = {}
+    for _, _, edge, data in graph.edges(keys=True, data=True):
+        edge_lengths[edge] = data["length_km"]
+    node_coordinates: dict[str, tuple[float, float]] = get_node_attributes(graph, "coordinates")
+    return CSRGraph.from_edges(
+        list(graph.nodes), connectivity_graph.edges_to_nodes, source, edge_lengths, node_coordinates
+    )
+
+
 def get_connectivity_graph(
-    hierarchy_input: HierarchyInput, graph_path: Path
-) -> ConnectivityGraph | None:
+    hierarchy_input: HierarchyInput,
+    graph_path: Path,
+    graph_cache: "GraphCache[ConnectivityGraph] | GraphCache[CSRGraph] | None" = None,
+) -> ConnectivityGraph | CSRGraph | None:
     if hierarchy_input.gxp_name is None:
         return None
 
+    if graph_cache is not None:
+        return graph_cache.get(hierarchy_input.gxp_name)
+
     return read_connectivity_graph(graph_path / hierarchy_input.gxp_name)
 
 
+def get_source_node(connection: sqlite3.Connection, gxp_name: str) -> str | None:
+    # The highest voltage node of a GXP is taken as where it is supplied from
+    table_name: str = level_of_detail_table(LevelOfDetail.ALL)
+    cursor = connection.cursor()
+    sql: str = f"""
+    SELECT node FROM (
+        SELECT node_1 AS node, node_1_voltage AS voltage
+        FROM {table_name}
+        WHERE out_of_order_indicator = 'INS' AND gxp_name = ?
+        UNION ALL
+        SELECT node_2 AS node, node_2_voltage AS voltage
+        FROM {table_name}
+        WHERE out_of_order_indicator = 'INS' AND gxp_name = ? AND node_2 IS NOT NULL
+    )
+    WHERE voltage IS NOT NULL
+    ORDER BY voltage DESC, node
+    LIMIT 1;
+    """
+    cursor.execute(sql, [gxp_name, gxp_name])
+    row = cursor.fetchone()
+    cursor.close()
+    if row is None:
+        return None
+    source_node: str = row[0]
+    return source_node
+
+
 def connectivity_to_graph(
     connection: sqlite3.Connection, hierarchy_input: HierarchyInput | None = None
 ) -> ConnectivityGraph:
@@ -55,12 +131,20 @@ def connectivity_to_graph(
 
     cursor = connection.cursor()
 
+    # Node positions come from the ends of each line, or the point itself
     sql: str = f"""
     SELECT
         name,
         node_1,
         node_2,
-        normal_position
+        normal_position,
+        length_km,
+        CASE WHEN GeometryType({GEOMETRY_FIELD_NAME}) = 'POINT'
+            THEN X({GEOMETRY_FIELD_NAME}) ELSE X(StartPoint({GEOMETRY_FIELD_NAME})) END,
+        CASE WHEN GeometryType({GEOMETRY_FIELD_NAME}) = 'POINT'
+            THEN Y({GEOMETRY_FIELD_NAME}) ELSE Y(StartPoint({GEOMETRY_FIELD_NAME})) END,
+        X(EndPoint({GEOMETRY_FIELD_NAME})),
+        Y(EndPoint({GEOMETRY_FIELD_NAME}))
     FROM {table_name}
     WHERE out_of_order_indicator = 'INS'
     {additional_where_clause};
@@ -77,74 +161,146 @@ def connectivity_to_graph(
         node_1: str = row[1]
         node_2: str | None = row[2]
         normal_position: bool = bool(row[3])
+        length_km: float | None = row[4]
 
         G.add_node(node_1)
+        if row[5] is not None and "coordinates" not in G.nodes[node_1]:
+            G.nodes[node_1]["coordinates"] = (row[5], row[6])
         if node_2 is None:
             continue
         G.add_node(node_2)
+        if row[7] is not None and "coordinates" not in G.nodes[node_2]:
+            G.nodes[node_2]["coordinates"] = (row[7], row[8])
+
+        if length_km is None:
+            length_km = (
+                great_circle_km(row[5], row[6], row[7], row[8]) if row[7] is not None else 0.0
+            )
 
         if normal_position:
-            G.add_edge(node_1, node_2, edge_name)
+            G.add_edge(node_1, node_2, edge_name, length_km=length_km)
             edges_to_nodes[edge_name] = (node_1, node_2)
 
     cursor.close()
 
+    chord_lengths: list[float] = []
+    edge_lengths: list[float] = []
+    for node_1, node_2, data in G.edges(data=True):
+        coordinates_1: tuple[float, float] | None = G.nodes[node_1].get("coordinates")
+        coordinates_2: tuple[float, float] | None = G.nodes[node_2].get("coordinates")
+        if coordinates_1 is None or coordinates_2 is None:
+            chord_lengths.append(math.nan)
+        else:
+            chord_lengths.append(great_circle_km(*coordinates_1, *coordinates_2))
+        edge_lengths.append(data["length_km"])
+    lengths: FloatArray = np.array(edge_lengths, dtype=np.float64)
+    chords: FloatArray = np.array(chord_lengths, dtype=np.float64)
+    G.graph["heuristic_scale"] = heuristic_scale(lengths, chords)
+
     return ConnectivityGraph(G, edges_to_nodes)
 
 
+def graph_without_edges(
+    connectivity_graph: ConnectivityGraph, edges_to_exclude: list[str]
+) -> Graph:  # type: ignore[type-arg]
+    hidden_edges: list[tuple[str, str, str]] = []
+    for edge in edges_to_exclude:
+        if edge not in connectivity_graph.edges_to_nodes:
+            continue
+        a, b = connectivity_graph.edges_to_nodes[edge]
+        hidden_edges.append((a, b, edge))
+
+    if not hidden_edges:
+        return connectivity_graph.graph
+
+    # A read-only view, the shared graph is never mutated so it is safe across threads
+    view: Graph = restricted_view(  # type: ignore[type-arg]
+        connectivity_graph.graph, [], hidden_edges
+    )
+    return view
+
+
+def networkx_heuristic_km(
+    graph: Graph, node: str, target: str, scale: float  # type: ignore[type-arg]
+) -> float:
+    coordinates_a: tuple[float, float] | None = graph.nodes[node].get("coordinates")
+    coordinates_b: tuple[float, float] | None = graph.nodes[target].get("coordinates")
+    if coordinates_a is None or coordinates_b is None:
+        return 0.0
+    return scale * great_circle_km(*coordinates_a, *coordinates_b)
+
+
 def graph_shortest_path(
     hierarchy_input: HierarchyInput,
     graph_path: Path,
     node_a: str,
     node_b: str,
     edges_to_exclude: list[str],
+    graph_cache: "GraphCache[ConnectivityGraph] | GraphCache[CSRGraph] | None" = None,
+    network_index: NetworkIndex | None = None,
+    routing: RoutingMode = RoutingMode.HOPS,
 ) -> list[str]:
-    connectivity_graph: ConnectivityGraph | None = get_connectivity_graph(
-        hierarchy_input, graph_path
+    if hierarchy_input.gxp_name is None and network_index is not None and graph_cache is not None:
+        return network_shortest_path(
+            network_index, graph_cache, node_a, node_b, edges_to_exclude, routing
+        )
+
+    connectivity_graph: ConnectivityGraph | CSRGraph | None = get_connectivity_graph(
+        hierarchy_input, graph_path, graph_cache
     )
     if connectivity_graph is None:
         return []
 
+    if isinstance(connectivity_graph, CSRGraph):
+        if not connectivity_graph.has_node(node_a) or not connectivity_graph.has_node(node_b):
+            return []
+        csr_path: list[str] | None = connectivity_graph.shortest_path(
+            node_a, node_b, connectivity_graph.edge_mask(edges_to_exclude), routing
+        )
+        return csr_path if csr_path is not None else []
+
     if not connectivity_graph.graph.has_node(node_a) or not connectivity_graph.graph.has_node(
         node_b
     ):
         return []
 
-    for edge in edges_to_exclude:
-        if edge not in connectivity_graph.edges_to_nodes:
-            continue
-        a, b = connectivity_graph.edges_to_nodes[edge]
-        if connectivity_graph.graph.has_edge(a, b, edge):
-            connectivity_graph.graph.remove_edge(a, b, edge)
+    graph: Graph = graph_without_edges(  # type: ignore[type-arg]
+        connectivity_graph, edges_to_exclude
+    )
 
-    def cleanup() -> None:
-        for edge in edges_to_exclude:
-            if edge not in connectivity_graph.edges_to_nodes:
-                continue
-            a, b = connectivity_graph.edges_to_nodes[edge]
-            connectivity_graph.graph.add_edge(a, b, edge)
+    # Graphs pickled before the scale was recorded are routed with Dijkstra
+    scale: float = connectivity_graph.graph.graph.get("heuristic_scale", 0.0)
+    if routing == RoutingMode.ASTAR and scale <= 0:
+        routing = RoutingMode.LENGTH
 
     try:
-        node_path: list[str] = shortest_path(connectivity_graph.graph, node_a, node_b)
+        node_path: list[str]
+        match routing:
+            case RoutingMode.HOPS:
+                node_path = shortest_path(graph, node_a, node_b)
+            case RoutingMode.LENGTH:
+                node_path = shortest_path(graph, node_a, node_b, weight="length_km")
+            case RoutingMode.ASTAR:
+                node_path = astar_path(
+                    graph,
+                    node_a,
+                    node_b,
+                    heuristic=lambda u, v: networkx_heuristic_km(graph, u, v, scale),
+                    weight="length_km",
+                )
     except (NetworkXNoPath, NodeNotFound):
-        cleanup()
         return []
     edge_path: list[str] = []
     for i, current_node in enumerate(node_path):
         if i == 0:
             continue
         previous_node: str = node_path[i - 1]
-        edges: list[str] = list(
-            connectivity_graph.graph.get_edge_data(  # type: ignore[arg-type]
-                current_node,
-                previous_node,
-            ).keys()
-        )
-        found_edge: str = edges[0]
+        edge_data: dict[str, dict[str, float]] = graph.get_edge_data(current_node, previous_node)
+        found_edge: str = next(iter(edge_data))
+        if routing != RoutingMode.HOPS:
+            found_edge = min(edge_data, key=lambda edge: edge_data[edge]["length_km"])
         edge_path.append(found_edge)
 
-    cleanup()
-
     return edge_path
 
 
@@ -153,43 +309,72 @@ def graph_flood_fill(
     graph_path: Path,
     node: str,
     edges_to_exclude: list[str],
-) -> list[str]:
-    connectivity_graph: ConnectivityGraph | None = get_connectivity_graph(
-        hierarchy_input, graph_path
+    graph_cache: "GraphCache[ConnectivityGraph] | GraphCache[CSRGraph] | None" = None,
+    network_index: NetworkIndex | None = None,
+) -> Iterator[str]:
+    if hierarchy_input.gxp_name is None and network_index is not None and graph_cache is not None:
+        return network_flood_fill(network_index, graph_cache, node, edges_to_exclude)
+
+    connectivity_graph: ConnectivityGraph | CSRGraph | None = get_connectivity_graph(
+        hierarchy_input, graph_path, graph_cache
     )
     if connectivity_graph is None:
-        return []
+        return iter([])
+
+    if isinstance(connectivity_graph, CSRGraph):
+        if not connectivity_graph.has_node(node):
+            return iter([])
+        return connectivity_graph.flood_fill(node, connectivity_graph.edge_mask(edges_to_exclude))
 
     if not connectivity_graph.graph.has_node(node):
-        return []
+        return iter([])
 
-    for edge in edges_to_exclude:
-        if edge not in connectivity_graph.edges_to_nodes:
-            continue
-        a, b = connectivity_graph.edges_to_nodes[edge]
-        if connectivity_graph.graph.has_edge(a, b, edge):
-            connectivity_graph.graph.remove_edge(a, b, edge)
+    graph: Graph = graph_without_edges(  # type: ignore[type-arg]
+        connectivity_graph, edges_to_exclude
+    )
 
-    def cleanup() -> None:
-        for edge in edges_to_exclude:
-            if edge not in connectivity_graph.edges_to_nodes:
-                continue
-            a, b = connectivity_graph.edges_to_nodes[edge]
-            connectivity_graph.graph.add_edge(a, b, edge)
+    component: set[str] = node_connected_component(graph, node)
+    subgraph: MultiGraph = graph.subgraph(component)  # type: ignore[type-arg, assignment]
+    return (edge for _, _, edge in subgraph.edges(keys=True))
 
-    try:
-        edge_path: list[str] = []
-        for node_a_b in dfs_edges(connectivity_graph.graph, source=node, depth_limit=1000):
-            a, b = node_a_b
-            edges: list[str] = list(
-                connectivity_graph.graph.get_edge_data(a, b).keys()  # type: ignore[arg-type]
-            )
-            found_edge: str = edges[0]
-            edge_path.append(found_edge)
-    except Exception:
-        cleanup()
-        return []
 
-    cleanup()
+def get_csr_graph(
+    gxp_name: str,
+    graph_path: Path,
+    graph_cache: "GraphCache[ConnectivityGraph] | GraphCache[CSRGraph] | None" = None,
+) -> CSRGraph | None:
+    if graph_cache is not None:
+        cached_graph: ConnectivityGraph | CSRGraph | None = graph_cache.get(gxp_name)
+        if isinstance(cached_graph, CSRGraph):
+            return cached_graph
+    if not (graph_path / gxp_name / CSR_DIRECTORY_NAME).is_dir():
+        return None
+    return read_csr_graph(graph_path / gxp_name)
 
-    return edge_path
+
+def graph_upstream(
+    hierarchy_input: HierarchyInput,
+    graph_path: Path,
+    node: str,
+    graph_cache: "GraphCache[ConnectivityGraph] | GraphCache[CSRGraph] | None" = None,
+    network_index: NetworkIndex | None = None,
+) -> list[tuple[str, str]]:
+    gxp_names: list[str] = []
+    if hierarchy_input.gxp_name is not None:
+        gxp_names = [hierarchy_input.gxp_name]
+    elif network_index is not None:
+        node_id: int | None = network_index.node_id(node)
+        if node_id is not None:
+            gxp_names = [
+                network_index.partition_names[partition]
+                for partition in network_index.partitions_of(node_id)
+            ]
+
+    for gxp_name in gxp_names:
+        csr_graph: CSRGraph | None = get_csr_graph(gxp_name, graph_path, graph_cache)
+        if csr_graph is None:
+            continue
+        hops: list[tuple[str, str]] | None = csr_graph.upstream(node)
+        if hops is not None:
+            return hops
+    return []
@@ -0,0 +1,194 @@
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Generic, NamedTuple, TypeVar
+
+from networkx import freeze
+
+from src.csr_graph import CSR_DIRECTORY_NAME, CSR_MANIFEST_FILE_NAME, CSRGraph, read_csr_graph
+from src.graph import ConnectivityGraph, GraphEngine, read_connectivity_graph
+
+
+GraphT = TypeVar("GraphT")
+
+GRAPH_FILE_NAMES: list[str] = ["graph.pickle", "edges_to_nodes.pickle"]
+# The manifest is written last, so its modification time versions the whole directory
+CSR_GRAPH_FILE_NAMES: list[str] = [f"{CSR_DIRECTORY_NAME}/{CSR_MANIFEST_FILE_NAME}"]
+USAGE_FILE_NAME: str = "usage.json"
+
+# Rough ratio of in-memory networkx objects to their pickled size
+MEMORY_PER_FILE_BYTE: int = 4
+
+
+class GraphKey(NamedTuple):
+    gxp_name: str
+    version: int
+
+
+class CachedGraph(NamedTuple, Generic[GraphT]):
+    graph: GraphT
+    size_bytes: int
+    load_seconds: float
+
+
+def graph_version(path: Path, file_names: list[str]) -> int | None:
+    version: int = 0
+    for file_name in file_names:
+        try:
+            version = max(version, os.stat(path / file_name).st_mtime_ns)
+        except FileNotFoundError:
+            return None
+    return version
+
+
+def estimate_graph_size(path: Path) -> int:
+    file_bytes: int = sum(os.path.getsize(path / file_name) for file_name in GRAPH_FILE_NAMES)
+    return file_bytes * MEMORY_PER_FILE_BYTE
+
+
+def load_networkx_graph(path: Path) -> tuple[ConnectivityGraph, int]:
+    # Every request thread shares the cached graph, so it is frozen and any attempt to
+    # exclude edges in place raises instead of leaking into other requests
+    connectivity_graph: ConnectivityGraph = read_connectivity_graph(path)
+    freeze(connectivity_graph.graph)
+    return connectivity_graph, estimate_graph_size(path)
+
+
+def load_csr_graph(path: Path) -> tuple[CSRGraph, int]:
+    csr_graph: CSRGraph = read_csr_graph(path)
+    return csr_graph, csr_graph.size_bytes()
+
+
+class GraphCache(Generic[GraphT]):
+    def __init__(
+        self,
+        graph_path: Path,
+        memory_budget_bytes: int,
+        loader: Callable[[Path], tuple[GraphT, int]],
+        file_names: list[str],
+    ) -> None:
+        self.graph_path = graph_path
+        self.memory_budget_bytes = memory_budget_bytes
+        self.loader = loader
+        self.file_names = file_names
+
+        self._lock = threading.Lock()
+        self._graphs: OrderedDict[GraphKey, CachedGraph[GraphT]] = OrderedDict()
+        self._loading: dict[GraphKey, threading.Lock] = {}
+        self._size_bytes: int = 0
+
+        self.hits: int = 0
+        self.misses: int = 0
+        self.evictions: int = 0
+        self.load_seconds: dict[str, float] = {}
+        self.usage: dict[str, int] = self.read_usage()
+
+    def get(self, gxp_name: str) -> GraphT | None:
+        path: Path = self.graph_path / gxp_name
+        version: int | None = graph_version(path, self.file_names)
+        if version is None:
+            return None
+        key: GraphKey = GraphKey(gxp_name, version)
+
+        with self._lock:
+            self.usage[gxp_name] = self.usage.get(gxp_name, 0) + 1
+            cached: CachedGraph[GraphT] | None = self._graphs.get(key)
+            if cached is not None:
+                self._graphs.move_to_end(key)
+                self.hits += 1
+                return cached.graph
+            loading_lock: threading.Lock = self._loading.setdefault(key, threading.Lock())
+
+        with loading_lock:
+            with self._lock:
+                cached = self._graphs.get(key)
+                if cached is not None:
+                    self._graphs.move_to_end(key)
+                    self.hits += 1
+                    return cached.graph
+                self.misses += 1
+
+            try:
+                start: float = time.perf_counter()
+                graph, size_bytes = self.loader(path)
+                load_seconds: float = time.perf_counter() - start
+                print(f"Loaded graph for GXP `{gxp_name}` in {load_seconds:.3f}s")
+
+                self.insert(key, CachedGraph(graph, size_bytes, load_seconds))
+            finally:
+                with self._lock:
+                    self._loading.pop(key, None)
+            return graph
+
+    def insert(self, key: GraphKey, cached: CachedGraph[GraphT]) -> None:
+        with self._lock:
+            for existing_key in list(self._graphs.keys()):
+                if existing_key.gxp_name == key.gxp_name and existing_key != key:
+                    self.remove(existing_key)
+
+            self._graphs[key] = cached
+            self._size_bytes += cached.size_bytes
+            self.load_seconds[key.gxp_name] = cached.load_seconds
+
+            while self._size_bytes > self.memory_budget_bytes and len(self._graphs) > 1:
+                oldest_key: GraphKey = next(iter(self._graphs))
+                self.remove(oldest_key)
+                self.evictions += 1
+
+    def remove(self, key: GraphKey) -> None:
+        cached: CachedGraph[GraphT] = self._graphs.pop(key)
+        self._size_bytes -= cached.size_bytes
+
+    def read_usage(self) -> dict[str, int]:
+        try:
+            with open(self.graph_path / USAGE_FILE_NAME, "r") as f:
+                usage: dict[str, int] = json.load(f)
+                return usage
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def write_usage(self) -> None:
+        with self._lock:
+            usage: dict[str, int] = dict(self.usage)
+        with open(self.graph_path / USAGE_FILE_NAME, "w") as f:
+            json.dump(usage, f)
+
+    def warm_up(self, count: int) -> None:
+        most_used: list[str] = sorted(self.usage, key=lambda name: self.usage[name], reverse=True)
+        for gxp_name in most_used[:count]:
+            # `get` only counts a use when the graph's files exist
+            if self.get(gxp_name) is None:
+                continue
+            with self._lock:
+                self.usage[gxp_name] -= 1
+                if self._size_bytes >= self.memory_budget_bytes:
+                    break
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "size_bytes": self._size_bytes,
+                "memory_budget_bytes": self.memory_budget_bytes,
+                "cached": [key.gxp_name for key in self._graphs.keys()],
+                "load_seconds": dict(self.load_seconds),
+            }
+
+
+def create_graph_cache(
+    graph_path: Path, memory_budget_bytes: int, graph_engine: GraphEngine
+) -> GraphCache[ConnectivityGraph] | GraphCache[CSRGraph]:
+    match graph_engine:
+        case GraphEngine.NETWORKX:
+            return GraphCache(
+                graph_path, memory_budget_bytes, load_networkx_graph, GRAPH_FILE_NAMES
+            )
+        case GraphEngine.CSR:
+            return GraphCache(
+                graph_path, memory_budget_bytes, load_csr_graph, CSR_GRAPH_FILE_NAMES
+            )
@@ -32,7 +32,7 @@ class HierarchyInput(NamedTuple):
     gxp_name: str | None
     substation_name: str | None
     hv_feeder_code: str | None
-    dtx_name: str | None
+    dtx_code: str | None
     lv_circuit_code: str | None
 
     @classmethod
@@ -41,14 +41,14 @@ class HierarchyInput(NamedTuple):
         gxp_name: str | None = None,
         substation_name: str | None = None,
         hv_feeder_code: str | None = None,
-        dtx_name: str | None = None,
+        dtx_code: str | None = None,
         lv_circuit_code: str | None = None,
     ) -> Self:
         return cls(
             gxp_name=gxp_name,
             substation_name=substation_name,
             hv_feeder_code=hv_feeder_code,
-            dtx_name=dtx_name,
+            dtx_code=dtx_code,
             lv_circuit_code=lv_circuit_code,
         )
 
@@ -58,28 +58,30 @@ class HierarchyInput(NamedTuple):
             gxp_name=args.get("gxp"),
             substation_name=args.get("substation"),
             hv_feeder_code=args.get("hv"),
-            dtx_name=args.get("dtx"),
+            dtx_code=args.get("dtx"),
             lv_circuit_code=args.get("lv"),
         )
 
-    def create_sql_where_clause(self) -> tuple[str, list[str]]:
-        sql: str = ""
-        parameters: list[str] = []
+    def column_filters(self) -> list[tuple[str, str]]:
+        filters: list[tuple[str, str]] = []
         if self.gxp_name is not None:
-            sql += " AND gxp_name = ?"
-            parameters.append(self.gxp_name)
+            filters.append(("gxp_name", self.gxp_name))
         if self.substation_name is not None:
-            sql += " AND substation_name = ?"
-            parameters.append(self.substation_name)
+            filters.append(("substation_name", self.substation_name))
         if self.hv_feeder_code is not None:
-            sql += " AND hv_feeder_code = ?"
-            parameters.append(self.hv_feeder_code)
-        if self.dtx_name is not None:
-            sql += " AND dtx_name = ?"
-            parameters.append(self.dtx_name)
+            filters.append(("hv_feeder_code", self.hv_feeder_code))
+        if self.dtx_code is not None:
+            filters.append(("dtx_code", self.dtx_code))
         if self.lv_circuit_code is not None:
-            sql += " AND lv_circuit_code = ?"
-            parameters.append(self.lv_circuit_code)
+            filters.append(("lv_circuit_code", self.lv_circuit_code))
+        return filters
+
+    def create_sql_where_clause(self) -> tuple[str, list[str]]:
+        sql: str = ""
+        parameters: list[str] = []
+        for column_name, value in self.column_filters():
+            sql += f" AND {column_name} = ?"
+            parameters.append(value)
         if len(sql) == 0:
             return " AND 1=1", []
         return sql, parameters
@@ -88,6 +90,99 @@ class HierarchyInput(NamedTuple):
 class HierarchyOutput(NamedTuple):
     hierarchy_level: HierarchyLevel
     values: list[str]
+    child_counts: list[int]
+
+
+class HierarchyChildren(NamedTuple):
+    values: list[str]
+    child_counts: list[int]
+
+
+# Children of every node in the hierarchy, keyed by the names along the path to the node
+HierarchyTree = dict[tuple[str, ...], HierarchyChildren]
+
+HIERARCHY_TABLE: str = "hierarchy_tree"
+HIERARCHY_COLUMNS: list[str] = [
+    "gxp_name",
+    "substation_name",
+    "hv_feeder_code",
+    "dtx_code",
+    "lv_circuit_code",
+]
+
+
+def hierarchy_path(hierarchy_input: HierarchyInput) -> tuple[str, ...] | None:
+    # Only inputs naming each level down from the GXP map onto a node in the tree
+    path: list[str] = []
+    parent_count: int = len(HIERARCHY_COLUMNS) - 1
+    for value in hierarchy_input[:parent_count]:
+        if value is None:
+            break
+        if not value:
+            return None
+        path.append(value)
+    depth: int = len(path)
+    if any(value is not None for value in hierarchy_input[depth:]):
+        return None
+    return tuple(path)
+
+
+def create_hierarchy_table(connection: sqlite3.Connection) -> None:
+    print(f"Creating table `{HIERARCHY_TABLE}`")
+    cursor = connection.cursor()
+    sql: str = f"CREATE TABLE {HIERARCHY_TABLE} (\n\tdepth INTEGER"
+    for column_name in HIERARCHY_COLUMNS[:-1]:
+        sql += f",\n\t{column_name} TEXT"
+    sql += ",\n\tvalue TEXT,\n\tchild_count INTEGER\n);"
+    cursor.execute(sql)
+
+    # One pass per level, inserted in path then value order so children load pre-sorted
+    for depth, column in enumerate(HIERARCHY_COLUMNS):
+        parent_columns: list[str] = HIERARCHY_COLUMNS[:depth]
+        child_count: str = (
+            f"COUNT(DISTINCT {HIERARCHY_COLUMNS[depth + 1]})"
+            if depth + 1 < len(HIERARCHY_COLUMNS)
+            else "0"
+        )
+        insert_columns: str = ", ".join(parent_columns + ["value"])
+        group_columns: str = ", ".join(parent_columns + [column])
+        not_null: str = " AND ".join(f"{name} IS NOT NULL" for name in parent_columns + [column])
+        cursor.execute(f"""
+        INSERT INTO {HIERARCHY_TABLE} (depth, {insert_columns}, child_count)
+        SELECT {depth}, {group_columns}, {child_count}
+        FROM {level_of_detail_table(LevelOfDetail.ALL)}
+        WHERE out_of_order_indicator = 'INS' AND {not_null}
+        GROUP BY {group_columns}
+        ORDER BY {group_columns};
+        """)
+    connection.commit()
+    cursor.close()
+
+
+def load_hierarchy_tree(connection: sqlite3.Connection) -> HierarchyTree | None:
+    cursor = connection.cursor()
+    try:
+        cursor.execute(f"""
+        SELECT depth, {", ".join(HIERARCHY_COLUMNS[:-1])}, value, child_count
+        FROM {HIERARCHY_TABLE}
+        ORDER BY rowid;
+        """)
+    except sqlite3.OperationalError:
+        print(f"Table `{HIERARCHY_TABLE}` not found, hierarchy will be queried from SQL")
+        cursor.close()
+        return None
+
+    hierarchy_tree: HierarchyTree = {(): HierarchyChildren([], [])}
+    for row in cursor:
+        stop: int = row[0] + 1
+        path: tuple[str, ...] = tuple(row[1:stop])
+        children: HierarchyChildren = hierarchy_tree.setdefault(
+            path, HierarchyChildren([], [])
+        )
+        children.values.append(row[-2])
+        children.child_counts.append(row[-1])
+    cursor.close()
+    return hierarchy_tree
 
 
 def get_hierarchy(
@@ -104,7 +199,7 @@ def get_hierarchy(
         hierarchy_input.gxp_name
         and hierarchy_input.substation_name
         and hierarchy_input.hv_feeder_code
-        and hierarchy_input.dtx_name
+        and hierarchy_input.dtx_code
     ):
         hierarchy_level = HierarchyLevel.LV
         column = "lv_circuit_code"
@@ -114,7 +209,7 @@ def get_hierarchy(
         and hierarchy_input.hv_feeder_code
     ):
         hierarchy_level = HierarchyLevel.DTX
-        column = "dtx_name"
+        column = "dtx_code"
     elif hierarchy_input.gxp_name and hierarchy_input.substation_name:
         hierarchy_level = HierarchyLevel.HV
         column = "hv_feeder_code"
@@ -125,27 +220,49 @@ def get_hierarchy(
         hierarchy_level = HierarchyLevel.GXP
         column = "gxp_name"
 
+    depth: int = HIERARCHY_COLUMNS.index(column)
+    child_count: str = (
+        f"COUNT(DISTINCT {HIERARCHY_COLUMNS[depth + 1]})"
+        if depth + 1 < len(HIERARCHY_COLUMNS)
+        else "0"
+    )
+
     parameters.extend(extra_parameters)
 
     values: list[str] = []
+    child_counts: list[int] = []
 
     cursor = connection.cursor()
     sql = f"""
     SELECT
-        DISTINCT {column}
+        {column}, {child_count}
     FROM {level_of_detail_table(LevelOfDetail.ALL)}
     WHERE out_of_order_indicator = 'INS'
-    {additional_where_clause} AND {column} IS NOT NULL;
+    {additional_where_clause} AND {column} IS NOT NULL
+    GROUP BY {column}
+    ORDER BY {column};
     """
     cursor.execute(sql, parameters)
 
     rows = cursor.fetchall()
     for row in rows:
         values.append(row[0])
+        child_counts.append(row[1])
 
     cursor.close()
 
-    return HierarchyOutput(hierarchy_level, values)
+    return HierarchyOutput(hierarchy_level, values, child_counts)
+
+
+def get_hierarchy_from_tree(
+    hierarchy_tree: HierarchyTree, hierarchy_input: HierarchyInput
+) -> HierarchyOutput | None:
+    path: tuple[str, ...] | None = hierarchy_path(hierarchy_input)
+    if path is None:
+        return None
+    hierarchy_level: HierarchyLevel = list(HierarchyLevel)[len(path)]
+    children: HierarchyChildren = hierarchy_tree.get(path, HierarchyChildren([], []))
+    return HierarchyOutput(hierarchy_level, children.values, children.child_counts)
 
 
 def to_hierarchy_json(hierarchy_output: HierarchyOutput) -> dict[str, Any]:
@@ -153,12 +270,21 @@ def to_hierarchy_json(hierarchy_output: HierarchyOutput) -> dict[str, Any]:
         "level": hierarchy_output.hierarchy_level.name,
         "level_display_name": hierarchy_display_name(hierarchy_output.hierarchy_level),
         "count": len(hierarchy_output.values),
-        "values": sorted(hierarchy_output.values),
+        "values": hierarchy_output.values,
+        "child_counts": hierarchy_output.child_counts,
     }
 
 
 def get_hierarchy_json(
-    connection: sqlite3.Connection, hierarchy_input: HierarchyInput
+    connection: sqlite3.Connection,
+    hierarchy_input: HierarchyInput,
+    hierarchy_tree: HierarchyTree | None = None,
 ) -> dict[str, Any]:
-    hierarchy_output: HierarchyOutput = get_hierarchy(connection, hierarchy_input)
+    hierarchy_output: HierarchyOutput | None = (
+        get_hierarchy_from_tree(hierarchy_tree, hierarchy_input)
+        if hierarchy_tree is not None
+        else None
+    )
+    if hierarchy_output is None:
+        hierarchy_output = get_hierarchy(connection, hierarchy_input)
     return to_hierarchy_json(hierarchy_output)
@@ -4,24 +4,38 @@ from pathlib import Path
 
 from geopandas import GeoDataFrame
 
+from src.bundles import create_bundle_table
+from src.clusters import create_cluster_table
 from src.common_model import get_common_model
 from src.database import load_spatialite, create_all_tables, level_of_detail_table, LevelOfDetail
-from src.graph import ConnectivityGraph, connectivity_to_graph, write_connectivity_graph
-from src.hierarchy import HierarchyInput
+from src.csr_graph import write_csr_graph
+from src.graph import (
+    ConnectivityGraph,
+    connectivity_to_csr_graph,
+    connectivity_to_graph,
+    get_source_node,
+    write_connectivity_graph,
+)
+from src.facets import create_facet_table
+from src.hierarchy import HierarchyInput, create_hierarchy_table
+from src.network_graph import create_network_index, write_network_index
+from src.search import create_search_table
+from src.stats import create_stats_table
 
 
 def create_graph_files(connection: sqlite3.Connection, path: Path) -> None:
     sql: str = f"""
     SELECT DISTINCT gxp_name
     FROM {level_of_detail_table(LevelOfDetail.GXP)}
+    WHERE gxp_name IS NOT NULL
     """
     cursor: sqlite3.Cursor = connection.cursor()
     cursor.execute(sql)
     rows = cursor.fetchall()
     cursor.close()
 
-    for row in rows:
-        gxp_name: str = row[0]
+    gxp_names: list[str] = [row[0] for row in rows]
+    for gxp_name in gxp_names:
         print(f"Creating networkx graph for GXP `{gxp_name}`")
         connectivity_graph: ConnectivityGraph = connectivity_to_graph(
             connection, HierarchyInput.new(gxp_name=gxp_name)
@@ -29,6 +43,11 @@ def create_graph_files(connection: sqlite3.Connection, path: Path) -> None:
         graph_path: Path = path / gxp_name
         os.makedirs(graph_path, exist_ok=True)
         write_connectivity_graph(connectivity_graph, graph_path)
+        source: str | None = get_source_node(connection, gxp_name)
+        write_csr_graph(connectivity_to_csr_graph(connectivity_graph, source), graph_path)
+
+    print("Creating network index across GXP graphs")
+    write_network_index(create_network_index(path, gxp_names), path)
 
 
 def create_or_replace_databases(
@@ -45,6 +64,18 @@ def create_or_replace_databases(
 
     create_all_tables(connection, common_model)
 
+    create_cluster_table(connection)
+
+    create_hierarchy_table(connection)
+
+    create_search_table(connection)
+
+    create_facet_table(connection)
+
+    create_stats_table(connection)
+
+    create_bundle_table(connection)
+
     create_graph_files(connection, graph_path)
 
     return connection
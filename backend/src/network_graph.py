@@ -0,0 +1,294 @@
+import heapq
+import json
+import math
+import os
+from collections import deque
+from pathlib import Path
+from typing import TYPE_CHECKING, Iterator
+
+import numpy as np
+
+from src.csr_graph import (
+    BoolArray,
+    CSRGraph,
+    IdArray,
+    RoutingMode,
+    StringTable,
+    map_bytes,
+    read_csr_graph,
+    replace_file,
+)
+
+if TYPE_CHECKING:
+    from src.graph import ConnectivityGraph
+    from src.graph_cache import GraphCache
+
+
+NETWORK_FORMAT_VERSION: int = 1
+NETWORK_DIRECTORY_NAME: str = "network"
+NETWORK_MANIFEST_FILE_NAME: str = "manifest.json"
+
+
+class NetworkIndex:
+    # Maps every node to the GXP partitions containing it, and lists the nodes shared
+    # between partitions so traces can hop across GXP boundaries
+    def __init__(
+        self,
+        partition_names: list[str],
+        node_names: StringTable,
+        node_partition_starts: IdArray,
+        node_partitions: IdArray,
+        boundary_starts: IdArray,
+        boundary_nodes: IdArray,
+    ) -> None:
+        self.partition_names = partition_names
+        self.node_names = node_names
+        self.node_partition_starts = node_partition_starts
+        self.node_partitions = node_partitions
+        self.boundary_starts = boundary_starts
+        self.boundary_nodes = boundary_nodes
+
+    def node_id(self, node: str) -> int | None:
+        return self.node_names.index(node)
+
+    def partitions_of(self, node_id: int) -> list[int]:
+        start: int = int(self.node_partition_starts[node_id])
+        stop: int = int(self.node_partition_starts[node_id + 1])
+        return [int(partition) for partition in self.node_partitions[start:stop]]
+
+    def boundary_nodes_of(self, partition: int) -> list[int]:
+        start: int = int(self.boundary_starts[partition])
+        stop: int = int(self.boundary_starts[partition + 1])
+        return [int(node) for node in self.boundary_nodes[start:stop]]
+
+
+def create_network_index(graph_path: Path, partition_names: list[str]) -> NetworkIndex:
+    node_partition_lists: dict[str, list[int]] = {}
+    for partition, partition_name in enumerate(partition_names):
+        node_names: StringTable = read_csr_graph(graph_path / partition_name).node_names
+        for i in range(len(node_names)):
+            node_partition_lists.setdefault(node_names[i], []).append(partition)
+
+    sorted_names: list[str] = sorted(node_partition_lists.keys())
+    node_partition_starts: IdArray = np.zeros(len(sorted_names) + 1, dtype=np.int32)
+    node_partitions: list[int] = []
+    boundary_lists: list[list[int]] = [[] for _ in partition_names]
+    for node_id, node_name in enumerate(sorted_names):
+        partitions: list[int] = node_partition_lists[node_name]
+        node_partitions.extend(partitions)
+        node_partition_starts[node_id + 1] = len(node_partitions)
+        if len(partitions) > 1:
+            for partition in partitions:
+                boundary_lists[partition].append(node_id)
+
+    boundary_starts: IdArray = np.zeros(len(partition_names) + 1, dtype=np.int32)
+    np.cumsum([len(nodes) for nodes in boundary_lists], out=boundary_starts[1:])
+    boundary_nodes: IdArray = np.array(
+        [node_id for nodes in boundary_lists for node_id in nodes], dtype=np.int32
+    )
+
+    return NetworkIndex(
+        partition_names,
+        StringTable.from_strings(sorted_names),
+        node_partition_starts,
+        np.array(node_partitions, dtype=np.int32),
+        boundary_starts,
+        boundary_nodes,
+    )
+
+
+def write_network_index(network_index: NetworkIndex, graph_path: Path) -> None:
+    path: Path = graph_path / NETWORK_DIRECTORY_NAME
+    os.makedirs(path, exist_ok=True)
+
+    replace_file(path / "node_offsets.npy", network_index.node_names.offsets)
+    replace_file(path / "node_names.bin", network_index.node_names.data.tobytes())
+    replace_file(path / "node_partition_starts.npy", network_index.node_partition_starts)
+    replace_file(path / "node_partitions.npy", network_index.node_partitions)
+    replace_file(path / "boundary_starts.npy", network_index.boundary_starts)
+    replace_file(path / "boundary_nodes.npy", network_index.boundary_nodes)
+
+    manifest: dict[str, int | list[str]] = {
+        "format_version": NETWORK_FORMAT_VERSION,
+        "partition_names": network_index.partition_names,
+    }
+    replace_file(path / NETWORK_MANIFEST_FILE_NAME, json.dumps(manifest).encode("utf-8"))
+
+
+def read_network_index(graph_path: Path) -> NetworkIndex | None:
+    path: Path = graph_path / NETWORK_DIRECTORY_NAME
+    try:
+        with open(path / NETWORK_MANIFEST_FILE_NAME, "r") as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        return None
+    if manifest["format_version"] != NETWORK_FORMAT_VERSION:
+        raise ValueError(
+            f"Network index `{path}` has format version {manifest['format_version']}, "
+            f"expected {NETWORK_FORMAT_VERSION}. Refresh the databases."
+        )
+
+    return NetworkIndex(
+        manifest["partition_names"],
+        StringTable(
+            np.load(path / "node_offsets.npy", mmap_mode="r"), map_bytes(path / "node_names.bin")
+        ),
+        np.load(path / "node_partition_starts.npy", mmap_mode="r"),
+        np.load(path / "node_partitions.npy", mmap_mode="r"),
+        np.load(path / "boundary_starts.npy", mmap_mode="r"),
+        np.load(path / "boundary_nodes.npy", mmap_mode="r"),
+    )
+
+
+class PartitionLoader:
+    # Loads partitions on first use within a query, together with their edge masks
+    def __init__(
+        self,
+        network_index: NetworkIndex,
+        graph_cache: "GraphCache[ConnectivityGraph] | GraphCache[CSRGraph]",
+        edges_to_exclude: list[str],
+    ) -> None:
+        self.network_index = network_index
+        self.graph_cache = graph_cache
+        self.edges_to_exclude = edges_to_exclude
+        self.graphs: dict[int, CSRGraph | None] = {}
+        self.edge_masks: dict[int, BoolArray | None] = {}
+
+    def graph(self, partition: int) -> CSRGraph | None:
+        if partition not in self.graphs:
+            graph = self.graph_cache.get(self.network_index.partition_names[partition])
+            self.graphs[partition] = graph if isinstance(graph, CSRGraph) else None
+            self.edge_masks[partition] = (
+                graph.edge_mask(self.edges_to_exclude) if isinstance(graph, CSRGraph) else None
+            )
+        return self.graphs[partition]
+
+    def local_id(self, graph: CSRGraph, node_id: int) -> int | None:
+        return graph.node_id(self.network_index.node_names[node_id])
+
+
+def network_shortest_path(
+    network_index: NetworkIndex,
+    graph_cache: "GraphCache[ConnectivityGraph] | GraphCache[CSRGraph]",
+    node_a: str,
+    node_b: str,
+    edges_to_exclude: list[str],
+    routing: RoutingMode = RoutingMode.HOPS,
+) -> list[str]:
+    id_a: int | None = network_index.node_id(node_a)
+    id_b: int | None = network_index.node_id(node_b)
+    if id_a is None or id_b is None:
+        return []
+
+    loader: PartitionLoader = PartitionLoader(network_index, graph_cache, edges_to_exclude)
+    partitions_b: list[int] = network_index.partitions_of(id_b)
+
+    # Dijkstra over the boundary nodes, where each hop is a path inside one partition.
+    # Partitions are only loaded once the search reaches one of their nodes.
+    distances: dict[int, float] = {id_a: 0.0}
+    previous: dict[int, tuple[int, int]] = {}
+    settled: set[int] = set()
+    queue: list[tuple[float, int]] = [(0.0, id_a)]
+    while queue:
+        distance, node_id = heapq.heappop(queue)
+        if node_id in settled:
+            continue
+        settled.add(node_id)
+        if node_id == id_b:
+            break
+
+        for partition in network_index.partitions_of(node_id):
+            graph: CSRGraph | None = loader.graph(partition)
+            if graph is None:
+                continue
+            local_node: int | None = loader.local_id(graph, node_id)
+            if local_node is None:
+                continue
+            local_distances = graph.distances(local_node, loader.edge_masks[partition], routing)
+
+            targets: list[int] = network_index.boundary_nodes_of(partition)
+            if partition in partitions_b:
+                targets.append(id_b)
+            for target in targets:
+                if target in settled:
+                    continue
+                local_target: int | None = loader.local_id(graph, target)
+                if local_target is None or not np.isfinite(local_distances[local_target]):
+                    continue
+                target_distance: float = distance + float(local_distances[local_target])
+                if target_distance < distances.get(target, math.inf):
+                    distances[target] = target_distance
+                    previous[target] = (node_id, partition)
+                    heapq.heappush(queue, (target_distance, target))
+
+    if id_b not in settled:
+        return []
+
+    hops: list[tuple[int, int, int]] = []
+    current: int = id_b
+    while current != id_a:
+        previous_node, partition = previous[current]
+        hops.append((previous_node, current, partition))
+        current = previous_node
+    hops.reverse()
+
+    edge_path: list[str] = []
+    for start, stop, partition in hops:
+        hop_graph: CSRGraph | None = loader.graph(partition)
+        if hop_graph is None:
+            return []
+        hop_path: list[str] | None = hop_graph.shortest_path(
+            network_index.node_names[start],
+            network_index.node_names[stop],
+            loader.edge_masks[partition],
+            routing,
+        )
+        if hop_path is None:
+            return []
+        edge_path.extend(hop_path)
+    return edge_path
+
+
+def network_flood_fill(
+    network_index: NetworkIndex,
+    graph_cache: "GraphCache[ConnectivityGraph] | GraphCache[CSRGraph]",
+    node: str,
+    edges_to_exclude: list[str],
+) -> Iterator[str]:
+    # Partitions are loaded as the edges are consumed, so a page stops the traversal early
+    node_id: int | None = network_index.node_id(node)
+    if node_id is None:
+        return
+
+    loader: PartitionLoader = PartitionLoader(network_index, graph_cache, edges_to_exclude)
+    reached: dict[int, BoolArray] = {}
+
+    entries: deque[tuple[int, int]] = deque(
+        (partition, node_id) for partition in network_index.partitions_of(node_id)
+    )
+    while entries:
+        partition, entry = entries.popleft()
+        graph: CSRGraph | None = loader.graph(partition)
+        if graph is None:
+            continue
+        local_entry: int | None = loader.local_id(graph, entry)
+        if local_entry is None:
+            continue
+        partition_reached: BoolArray = reached.setdefault(
+            partition, np.zeros(len(graph.node_names), dtype=np.bool_)
+        )
+        if partition_reached[local_entry]:
+            continue
+
+        nodes, edges = graph.reachable(local_entry, loader.edge_masks[partition])
+        partition_reached[nodes] = True
+        for edge in edges:
+            yield graph.edge_names[edge]
+
+        for boundary_node in network_index.boundary_nodes_of(partition):
+            local_boundary: int | None = loader.local_id(graph, boundary_node)
+            if local_boundary is None or not partition_reached[local_boundary]:
+                continue
+            for other_partition in network_index.partitions_of(boundary_node):
+                if other_partition != partition:
+                    entries.append((other_partition, boundary_node))
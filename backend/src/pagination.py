@@ -0,0 +1,109 @@
+from bisect import bisect_right
+from itertools import islice
+from typing import Any, Iterator, Mapping, NamedTuple, Self
+
+import msgspec
+
+
+PAGE_TOTAL_HEADER: str = "X-Total-Count"
+PAGE_CURSOR_HEADER: str = "X-Next-Cursor"
+
+
+class PageRequest(NamedTuple):
+    limit: int
+    has_cursor: bool
+    # The sort key of the last value on the previous page, NULL keys are None
+    after: Any
+
+    @classmethod
+    def parse_request_args(cls, args: Mapping[str, str], page_size_limit: int) -> Self | None:
+        limit: int = page_size_limit
+        limit_text: str | None = args.get("limit")
+        if limit_text is not None and limit_text.isdigit():
+            limit = max(1, min(int(limit_text), page_size_limit))
+
+        # Cursors are JSON encoded keys, so they keep their type between requests
+        cursor: str | None = args.get("after")
+        if cursor is None:
+            return cls(limit, False, None)
+        try:
+            return cls(limit, True, msgspec.json.decode(cursor))
+        except msgspec.DecodeError:
+            return None
+
+
+class Page(NamedTuple):
+    values: list[Any]
+    # None when counting would mean producing every value
+    total: int | None
+    next_cursor: str | None
+
+
+def keyset_condition(column: str, page_request: PageRequest | None) -> tuple[str, list[Any]]:
+    if page_request is None or not page_request.has_cursor:
+        return "", []
+    # NULLs sort first, so everything after a NULL key is not NULL
+    if page_request.after is None:
+        return f" AND {column} IS NOT NULL", []
+    return f" AND {column} > ?", [page_request.after]
+
+
+def limit_clause(page_request: PageRequest | None) -> str:
+    # One extra row tells whether there is another page
+    return f" LIMIT {page_request.limit + 1}" if page_request is not None else ""
+
+
+def create_page(
+    values: list[Any], keys: list[Any], total: int | None, limit: int | None
+) -> Page:
+    if limit is None or len(values) <= limit:
+        return Page(values, total, None)
+    return Page(values[:limit], total, msgspec.json.encode(keys[limit - 1]).decode("utf-8"))
+
+
+def sqlite_sort_key(value: Any) -> tuple[int, Any]:
+    # Orders mixed values like SQLite, NULL before numbers before text before blobs
+    if value is None:
+        return 0, 0
+    if isinstance(value, (int, float)):
+        return 1, value
+    if isinstance(value, str):
+        return 2, value
+    return 3, value
+
+
+def paginate_sorted(
+    values: list[Any], keys: list[Any], page_request: PageRequest | None
+) -> Page:
+    # For results already in memory, with keys in SQLite order
+    if page_request is None:
+        return Page(values, len(values), None)
+    start: int = 0
+    if page_request.has_cursor:
+        start = bisect_right(keys, sqlite_sort_key(page_request.after), key=sqlite_sort_key)
+    stop: int = start + page_request.limit + 1
+    return create_page(values[start:stop], keys[start:stop], len(values), page_request.limit)
+
+
+def paginate_iterator(values: Iterator[Any], page_request: PageRequest) -> Page:
+    # For lazily produced results without a natural key, keyed by their position. Only
+    # values up to the end of the page are produced.
+    start: int = 0
+    if page_request.has_cursor:
+        if not isinstance(page_request.after, int):
+            return Page([], None, None)
+        start = max(0, page_request.after + 1)
+    stop: int = start + page_request.limit + 1
+    page_values: list[Any] = list(islice(values, start, stop))
+    return create_page(
+        page_values, list(range(start, start + len(page_values))), None, page_request.limit
+    )
+
+
+def page_headers(page: Page) -> dict[str, str]:
+    headers: dict[str, str] = {}
+    if page.total is not None:
+        headers[PAGE_TOTAL_HEADER] = str(page.total)
+    if page.next_cursor is not None:
+        headers[PAGE_CURSOR_HEADER] = page.next_cursor
+    return headers
@@ -0,0 +1,69 @@
+import sqlite3
+
+from src.database import LevelOfDetail, level_of_detail_table
+from src.hierarchy import HIERARCHY_COLUMNS, HierarchyInput
+
+
+SEARCH_TABLE: str = "search_index"
+SEARCH_RESULT_LIMIT: int = 200
+# The trigram tokenizer can only use its index for inputs of at least one trigram
+SEARCH_INDEX_MIN_LENGTH: int = 3
+
+SEARCH_COLUMNS: list[str] = ["name", "object_id"]
+
+
+def create_search_table(connection: sqlite3.Connection) -> None:
+    print(f"Creating table `{SEARCH_TABLE}`")
+    columns: list[str] = SEARCH_COLUMNS + [f"{column} UNINDEXED" for column in HIERARCHY_COLUMNS]
+    cursor = connection.cursor()
+    cursor.execute(f"""
+    CREATE VIRTUAL TABLE {SEARCH_TABLE} USING fts5(
+        {", ".join(columns)},
+        tokenize = 'trigram'
+    );
+    """)
+
+    cursor.execute(f"""
+    INSERT INTO {SEARCH_TABLE} ({", ".join(SEARCH_COLUMNS + HIERARCHY_COLUMNS)})
+    SELECT
+        name, CAST(object_id AS TEXT), {", ".join(HIERARCHY_COLUMNS)}
+    FROM {level_of_detail_table(LevelOfDetail.ALL)}
+    WHERE name IS NOT NULL;
+    """)
+    cursor.execute(f"INSERT INTO {SEARCH_TABLE} ({SEARCH_TABLE}) VALUES ('optimize');")
+    connection.commit()
+    cursor.close()
+
+
+def get_search_index_results(
+    connection: sqlite3.Connection, typed_input: str, hierarchy_input: HierarchyInput
+) -> list[str] | None:
+    where_statement, parameters = hierarchy_input.create_sql_where_clause()
+    # Names ranked by where the input appears in them, then names matched on their object id
+    sql: str = f"""
+    SELECT
+        name
+    FROM {SEARCH_TABLE}
+    WHERE {SEARCH_TABLE} MATCH ?{where_statement}
+    GROUP BY name
+    ORDER BY
+        MIN(IIF(INSTR(LOWER(name), LOWER(?)) > 0, INSTR(LOWER(name), LOWER(?)), 1e9)),
+        name
+    LIMIT {SEARCH_RESULT_LIMIT};
+    """
+
+    match: str = '"' + typed_input.replace('"', '""') + '"'
+    parameters.insert(0, match)
+    parameters.extend([typed_input, typed_input])
+
+    cursor = connection.cursor()
+    try:
+        cursor.execute(sql, parameters)
+    except sqlite3.OperationalError:
+        # Databases built before the index existed are searched with LIKE instead
+        print(f"Table `{SEARCH_TABLE}` not found, search will be queried from SQL")
+        cursor.close()
+        return None
+    rows = cursor.fetchall()
+    cursor.close()
+    return [row[0] for row in rows]
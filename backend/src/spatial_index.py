@@ -0,0 +1,327 @@
+import math
+import sqlite3
+import time
+from typing import Any, NamedTuple
+
+import msgspec
+import numpy as np
+import numpy.typing as npt
+
+from src.common_model import CONNECTIVITY_COLUMNS
+from src.database import GEOMETRY_FIELD_NAME, LevelOfDetail, level_of_detail_table
+from src.geometry import Bounds, create_geometry_dict
+from src.hierarchy import HierarchyInput
+
+
+NODE_SIZE: int = 64
+
+PARTITION_COLUMNS: list[str] = ["gxp_name", "hv_feeder_code"]
+
+HIERARCHY_COLUMNS: list[str] = [
+    "gxp_name",
+    "substation_name",
+    "hv_feeder_code",
+    "dtx_code",
+    "lv_circuit_code",
+]
+
+FloatArray = npt.NDArray[np.float64]
+IntArray = npt.NDArray[np.int64]
+BoolArray = npt.NDArray[np.bool_]
+ObjectArray = npt.NDArray[np.object_]
+
+
+def str_order(
+    min_x: FloatArray, min_y: FloatArray, max_x: FloatArray, max_y: FloatArray, node_size: int
+) -> IntArray:
+    count: int = len(min_x)
+    if count == 0:
+        return np.zeros(0, dtype=np.int64)
+
+    center_x: FloatArray = (min_x + max_x) / 2
+    center_y: FloatArray = (min_y + max_y) / 2
+
+    leaf_count: int = math.ceil(count / node_size)
+    slice_count: int = math.ceil(math.sqrt(leaf_count))
+    slice_size: int = slice_count * node_size
+
+    x_rank: IntArray = np.empty(count, dtype=np.int64)
+    x_rank[np.argsort(center_x, kind="stable")] = np.arange(count)
+
+    return np.lexsort((center_y, x_rank // slice_size))
+
+
+class PackedLayout(NamedTuple):
+    order: IntArray
+    node_starts: IntArray
+    partition_nodes: dict[tuple[int, ...], tuple[int, int]]
+
+
+def partitioned_str_layout(
+    min_x: FloatArray,
+    min_y: FloatArray,
+    max_x: FloatArray,
+    max_y: FloatArray,
+    partition_codes: list[IntArray],
+    node_size: int,
+) -> PackedLayout:
+    count: int = len(min_x)
+    if count == 0:
+        return PackedLayout(np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), {})
+
+    grouped: IntArray = np.lexsort(tuple(reversed(partition_codes)))
+    keys: IntArray = np.stack([codes[grouped] for codes in partition_codes], axis=1)
+    changes: IntArray = np.flatnonzero(np.any(keys[1:] != keys[:-1], axis=1)) + 1
+    group_starts: IntArray = np.concatenate(([0], changes))
+    group_stops: IntArray = np.concatenate((changes, [count]))
+
+    order_parts: list[IntArray] = []
+    node_start_parts: list[IntArray] = []
+    partition_nodes: dict[tuple[int, ...], tuple[int, int]] = {}
+    node_count: int = 0
+    for group_start, group_stop in zip(group_starts, group_stops):
+        members: IntArray = grouped[group_start:group_stop]
+        members = members[
+            str_order(min_x[members], min_y[members], max_x[members], max_y[members], node_size)
+        ]
+        order_parts.append(members)
+        starts: IntArray = np.arange(group_start, group_stop, node_size, dtype=np.int64)
+        node_start_parts.append(starts)
+
+        # Partitions are sorted by key, so every key prefix covers a contiguous node range
+        key: tuple[int, ...] = tuple(int(code) for code in keys[group_start])
+        for depth in range(1, len(key) + 1):
+            first_node, _ = partition_nodes.get(key[:depth], (node_count, node_count))
+            partition_nodes[key[:depth]] = (first_node, node_count + len(starts))
+        node_count += len(starts)
+
+    return PackedLayout(
+        np.concatenate(order_parts), np.concatenate(node_start_parts), partition_nodes
+    )
+
+
+class PackedSpatialIndex:
+    def __init__(
+        self,
+        min_x: FloatArray,
+        min_y: FloatArray,
+        max_x: FloatArray,
+        max_y: FloatArray,
+        node_starts: IntArray,
+    ) -> None:
+        # Extents must already be in packed order, see `partitioned_str_layout`
+        self.min_x = min_x
+        self.min_y = min_y
+        self.max_x = max_x
+        self.max_y = max_y
+
+        count: int = len(min_x)
+        self.node_starts: IntArray = node_starts
+        self.node_stops: IntArray = np.append(node_starts[1:], count)
+
+        if count == 0:
+            self.node_min_x: FloatArray = np.zeros(0)
+            self.node_min_y: FloatArray = np.zeros(0)
+            self.node_max_x: FloatArray = np.zeros(0)
+            self.node_max_y: FloatArray = np.zeros(0)
+            return
+
+        self.node_min_x = np.minimum.reduceat(min_x, self.node_starts)
+        self.node_min_y = np.minimum.reduceat(min_y, self.node_starts)
+        self.node_max_x = np.maximum.reduceat(max_x, self.node_starts)
+        self.node_max_y = np.maximum.reduceat(max_y, self.node_starts)
+
+    def query(self, bounds: Bounds, node_range: tuple[int, int] | None = None) -> IntArray:
+        first_node, last_node = node_range if node_range is not None else (0, len(self.node_starts))
+        nodes: IntArray = first_node + np.flatnonzero(
+            (self.node_max_x[first_node:last_node] >= bounds.min_x)
+            & (self.node_min_x[first_node:last_node] <= bounds.max_x)
+            & (self.node_max_y[first_node:last_node] >= bounds.min_y)
+            & (self.node_min_y[first_node:last_node] <= bounds.max_y)
+        )
+        if len(nodes) == 0:
+            return np.zeros(0, dtype=np.int64)
+
+        starts: IntArray = self.node_starts[nodes]
+        lengths: IntArray = self.node_stops[nodes] - starts
+        offsets: IntArray = np.cumsum(lengths) - lengths
+        positions: IntArray = np.repeat(starts - offsets, lengths) + np.arange(lengths.sum())
+
+        mask: BoolArray = (
+            (self.max_x[positions] >= bounds.min_x)
+            & (self.min_x[positions] <= bounds.max_x)
+            & (self.max_y[positions] >= bounds.min_y)
+            & (self.min_y[positions] <= bounds.max_y)
+        )
+        return positions[mask]
+
+
+class EncodedColumn(NamedTuple):
+    codes: IntArray
+    lookup: dict[Any, int]
+
+
+class SpatialIndexTable(NamedTuple):
+    spatial_index: PackedSpatialIndex
+    partition_nodes: dict[tuple[int, ...], tuple[int, int]]
+    is_point: BoolArray
+    columns: dict[str, ObjectArray]
+    hierarchy_columns: dict[str, EncodedColumn]
+    geometries: ObjectArray
+
+
+def encode_column(values: ObjectArray) -> EncodedColumn:
+    lookup: dict[Any, int] = {}
+    codes: IntArray = np.empty(len(values), dtype=np.int64)
+    for i, value in enumerate(values):
+        codes[i] = lookup.setdefault(value, len(lookup))
+    return EncodedColumn(codes, lookup)
+
+
+def load_spatial_index_table(
+    connection: sqlite3.Connection, level_of_detail: LevelOfDetail
+) -> SpatialIndexTable:
+    table_name: str = level_of_detail_table(level_of_detail)
+    print(f"Loading `{table_name}` into the in-memory spatial index")
+
+    column_names: list[str] = list(CONNECTIVITY_COLUMNS.keys())
+    cursor = connection.cursor()
+    cursor.execute(f"""
+    SELECT
+        {", ".join(column_names)},
+        MbrMinX({GEOMETRY_FIELD_NAME}),
+        MbrMinY({GEOMETRY_FIELD_NAME}),
+        MbrMaxX({GEOMETRY_FIELD_NAME}),
+        MbrMaxY({GEOMETRY_FIELD_NAME}),
+        AsText({GEOMETRY_FIELD_NAME})
+    FROM {table_name}
+    WHERE {GEOMETRY_FIELD_NAME} IS NOT NULL;
+    """)
+    rows = cursor.fetchall()
+    cursor.close()
+
+    column_count: int = len(column_names)
+    extents: FloatArray = np.array(
+        [row[column_count : column_count + 4] for row in rows], dtype=np.float64  # noqa[E203]
+    ).reshape(-1, 4)
+
+    columns: dict[str, ObjectArray] = {}
+    for i, column_name in enumerate(column_names):
+        values: ObjectArray = np.empty(len(rows), dtype=object)
+        values[:] = [row[i] for row in rows]
+        columns[column_name] = values
+
+    hierarchy_columns: dict[str, EncodedColumn] = {
+        column_name: encode_column(columns[column_name]) for column_name in HIERARCHY_COLUMNS
+    }
+
+    layout: PackedLayout = partitioned_str_layout(
+        extents[:, 0],
+        extents[:, 1],
+        extents[:, 2],
+        extents[:, 3],
+        [hierarchy_columns[column_name].codes for column_name in PARTITION_COLUMNS],
+        NODE_SIZE,
+    )
+    order: IntArray = layout.order
+    extents = extents[order]
+    columns = {column_name: values[order] for column_name, values in columns.items()}
+    hierarchy_columns = {
+        column_name: EncodedColumn(encoded_column.codes[order], encoded_column.lookup)
+        for column_name, encoded_column in hierarchy_columns.items()
+    }
+
+    geometry_wkts: list[str] = [rows[i][-1] for i in order]
+    geometries: ObjectArray = np.empty(len(rows), dtype=object)
+    geometries[:] = [
+        msgspec.Raw(msgspec.json.encode(create_geometry_dict(wkt))) for wkt in geometry_wkts
+    ]
+    is_point: BoolArray = np.array([wkt[0] == "P" for wkt in geometry_wkts], dtype=np.bool_)
+
+    index: PackedSpatialIndex = PackedSpatialIndex(
+        extents[:, 0], extents[:, 1], extents[:, 2], extents[:, 3], layout.node_starts
+    )
+    return SpatialIndexTable(
+        index, layout.partition_nodes, is_point, columns, hierarchy_columns, geometries
+    )
+
+
+def partition_key_for(
+    table: SpatialIndexTable, hierarchy_input: HierarchyInput
+) -> tuple[int, ...] | None:
+    if hierarchy_input.gxp_name is None:
+        return None
+    partition_values: list[str | None] = [hierarchy_input.gxp_name, hierarchy_input.hv_feeder_code]
+
+    key: list[int] = []
+    for column_name, value in zip(PARTITION_COLUMNS, partition_values):
+        if value is None:
+            break
+        # Unknown values get a code no partition has, so the query is empty
+        key.append(table.hierarchy_columns[column_name].lookup.get(value, -1))
+    return tuple(key)
+
+
+class SpatialIndexEngine:
+    def __init__(self, tables: dict[LevelOfDetail, SpatialIndexTable]) -> None:
+        self.tables = tables
+
+    @classmethod
+    def load(cls, connection: sqlite3.Connection) -> "SpatialIndexEngine":
+        start: float = time.perf_counter()
+        tables: dict[LevelOfDetail, SpatialIndexTable] = {
+            level_of_detail: load_spatial_index_table(connection, level_of_detail)
+            for level_of_detail in LevelOfDetail
+        }
+        print(f"Loaded in-memory spatial index in {time.perf_counter() - start:.2f}s")
+        return cls(tables)
+
+    def get_geojson(
+        self,
+        level_of_detail: LevelOfDetail,
+        bounds: Bounds,
+        attribute_column: str,
+        hierarchy_input: HierarchyInput,
+        min_size_x: float = 0,
+        min_size_y: float = 0,
+    ) -> dict[str, Any]:
+        table: SpatialIndexTable = self.tables[level_of_detail]
+        index: PackedSpatialIndex = table.spatial_index
+
+        partition_key: tuple[int, ...] | None = partition_key_for(table, hierarchy_input)
+        node_range: tuple[int, int] | None = None
+        if partition_key is not None:
+            node_range = table.partition_nodes.get(partition_key, (0, 0))
+        positions: IntArray = index.query(bounds, node_range)
+
+        for column_name, value in hierarchy_input.column_filters():
+            if column_name not in table.hierarchy_columns:
+                positions = positions[:0]
+                break
+            encoded_column: EncodedColumn = table.hierarchy_columns[column_name]
+            code: int | None = encoded_column.lookup.get(value)
+            if code is None:
+                positions = positions[:0]
+                break
+            positions = positions[encoded_column.codes[positions] == code]
+
+        if min_size_x > 0 or min_size_y > 0:
+            positions = positions[
+                (index.max_x[positions] - index.min_x[positions] >= min_size_x)
+                | (index.max_y[positions] - index.min_y[positions] >= min_size_y)
+                | table.is_point[positions]
+            ]
+
+        names: ObjectArray = table.columns["name"][positions]
+        attributes: ObjectArray = table.columns[attribute_column][positions]
+        geometries: ObjectArray = table.geometries[positions]
+
+        features: list[dict[str, Any]] = [
+            {
+                "type": "Feature",
+                "geometry": geometry,
+                "properties": {"name": name, attribute_column: attribute},
+            }
+            for name, attribute, geometry in zip(names, attributes, geometries)
+        ]
+        return {"type": "FeatureCollection", "features": features}
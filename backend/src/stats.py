@@ -0,0 +1,110 @@
+import sqlite3
+from typing import Any
+
+from src.database import LevelOfDetail, level_of_detail_table
+from src.hierarchy import HIERARCHY_COLUMNS, HierarchyInput
+
+
+STATS_TABLE: str = "hierarchy_stats"
+
+# Breakdowns served by `/api/stats`, by the column each one groups on
+STATS_BREAKDOWNS: dict[str, str] = {
+    "object_type": "object_type",
+    "voltage": "node_1_voltage",
+    "status": "out_of_order_indicator",
+}
+STATS_TOTAL: str = "total"
+
+
+def rollup_selects(parent_columns: list[str], where_statement: str) -> list[str]:
+    source_table: str = level_of_detail_table(LevelOfDetail.ALL)
+    selects: list[str] = []
+    statistics: list[tuple[str, str | None]] = [(STATS_TOTAL, None)]
+    statistics.extend(STATS_BREAKDOWNS.items())
+    for statistic, column in statistics:
+        select_columns: list[str] = parent_columns + [f"'{statistic}'", column or "NULL"]
+        group_columns: list[str] = parent_columns + ([column] if column is not None else [])
+        group_statement: str = f" GROUP BY {', '.join(group_columns)}" if group_columns else ""
+        selects.append(f"""
+        SELECT {", ".join(select_columns)}, COUNT(*), TOTAL(length_km)
+        FROM {source_table}
+        WHERE {where_statement}{group_statement}
+        """)
+    return selects
+
+
+def create_stats_table(connection: sqlite3.Connection) -> None:
+    print(f"Creating table `{STATS_TABLE}`")
+    cursor = connection.cursor()
+    sql: str = f"CREATE TABLE {STATS_TABLE} (\n\tdepth INTEGER"
+    for column_name in HIERARCHY_COLUMNS:
+        sql += f",\n\t{column_name} TEXT"
+    sql += ",\n\tstatistic TEXT,\n\tvalue,\n\tfeature_count INTEGER,\n\tlength_km REAL\n);"
+    cursor.execute(sql)
+
+    # A row per statistic and value for every node of the hierarchy, and for the whole network
+    for depth in range(len(HIERARCHY_COLUMNS) + 1):
+        parent_columns: list[str] = HIERARCHY_COLUMNS[:depth]
+        not_null: str = " AND ".join(f"{name} IS NOT NULL" for name in parent_columns) or "1=1"
+        insert_columns: str = ", ".join(
+            parent_columns + ["statistic", "value", "feature_count", "length_km"]
+        )
+        for select in rollup_selects(parent_columns, not_null):
+            cursor.execute(f"""
+            INSERT INTO {STATS_TABLE} (depth, {insert_columns})
+            SELECT {depth}, * FROM ({select});
+            """)
+
+    cursor.execute(f"""
+    CREATE INDEX idx_{STATS_TABLE}_node ON {STATS_TABLE} (
+        depth, {", ".join(HIERARCHY_COLUMNS)}
+    );
+    """)
+    connection.commit()
+    cursor.close()
+
+
+def get_stats_json(
+    connection: sqlite3.Connection, hierarchy_input: HierarchyInput
+) -> dict[str, Any]:
+    where_statement, parameters = hierarchy_input.create_sql_where_clause()
+    filter_columns: list[str] = [column_name for column_name, _ in hierarchy_input.column_filters()]
+    depth: int = len(filter_columns)
+    if filter_columns == HIERARCHY_COLUMNS[:depth]:
+        sql: str = f"""
+        SELECT statistic, value, feature_count, length_km
+        FROM {STATS_TABLE}
+        WHERE depth = {depth}{where_statement}
+        ORDER BY 1, 2;
+        """
+    else:
+        # Filters that skip a level are aggregated from the connectivity table instead
+        sql = " UNION ALL ".join(rollup_selects([], where_statement.removeprefix(" AND ")))
+        sql += " ORDER BY 1, 2;"
+        parameters = parameters * (len(STATS_BREAKDOWNS) + 1)
+
+    cursor = connection.cursor()
+    cursor.execute(sql, parameters)
+    rows = cursor.fetchall()
+    cursor.close()
+
+    stats: dict[str, Any] = {"feature_count": 0, "length_km": 0.0}
+    for statistic in STATS_BREAKDOWNS.keys():
+        stats[statistic] = []
+    for statistic, value, feature_count, length_km in rows:
+        if statistic == STATS_TOTAL:
+            stats["feature_count"] = feature_count
+            stats["length_km"] = length_km
+        else:
+            stats[statistic].append(
+                {"value": value, "feature_count": feature_count, "length_km": length_km}
+            )
+
+    in_service_count: int = sum(
+        breakdown["feature_count"] for breakdown in stats["status"] if breakdown["value"] == "INS"
+    )
+    stats["in_service_count"] = in_service_count
+    stats["out_of_order_count"] = stats["feature_count"] - in_service_count
+    for statistic in STATS_BREAKDOWNS.keys():
+        stats[statistic].sort(key=lambda breakdown: -breakdown["feature_count"])
+    return stats
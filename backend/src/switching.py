@@ -0,0 +1,99 @@
+import multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Any, Iterator, NamedTuple
+
+import numpy as np
+
+from src.csr_graph import BoolArray, CSRGraph, IdArray, read_csr_graph
+
+
+class SwitchingScenario(NamedTuple):
+    scenario_id: int
+    excluded_edges: list[str]
+
+
+class ScenarioResult(NamedTuple):
+    scenario_id: int
+    excluded_edges: list[str]
+    isolated_nodes: list[str]
+    isolated_edges: list[str]
+
+
+def parse_scenarios(scenarios: str) -> list[SwitchingScenario]:
+    # Scenarios are separated by semicolons, and edges within one by commas, like `exclude`
+    return [
+        SwitchingScenario(i, [edge for edge in scenario.split(",") if edge])
+        for i, scenario in enumerate(scenarios.split(";"))
+    ]
+
+
+def each_edge_scenarios(csr_graph: CSRGraph, source: str) -> list[SwitchingScenario]:
+    # Only edges energised from the source can isolate anything when switched out
+    source_id: int | None = csr_graph.node_id(source)
+    if source_id is None:
+        return []
+    _, edges = csr_graph.reachable(source_id, None)
+    return [SwitchingScenario(i, [csr_graph.edge_names[edge]]) for i, edge in enumerate(edges)]
+
+
+def evaluate_scenarios(
+    graph_path: Path, source: str, scenarios: list[SwitchingScenario]
+) -> list[ScenarioResult]:
+    # Runs in a worker process, the memory mapped graph is shared between workers
+    csr_graph: CSRGraph = read_csr_graph(graph_path)
+    source_id: int | None = csr_graph.node_id(source)
+    if source_id is None:
+        return [
+            ScenarioResult(scenario.scenario_id, scenario.excluded_edges, [], [])
+            for scenario in scenarios
+        ]
+
+    energised_nodes, energised_edges = csr_graph.reachable(source_id, None)
+
+    results: list[ScenarioResult] = []
+    for scenario in scenarios:
+        edge_mask: BoolArray | None = csr_graph.edge_mask(scenario.excluded_edges)
+        nodes, edges = csr_graph.reachable(source_id, edge_mask)
+        isolated_nodes: IdArray = np.setdiff1d(energised_nodes, nodes)
+        isolated_edges: IdArray = np.setdiff1d(energised_edges, edges)
+        results.append(
+            ScenarioResult(
+                scenario.scenario_id,
+                scenario.excluded_edges,
+                [csr_graph.node_names[node] for node in isolated_nodes],
+                [csr_graph.edge_names[edge] for edge in isolated_edges],
+            )
+        )
+    return results
+
+
+def create_switching_executor(worker_count: int) -> ProcessPoolExecutor:
+    # Spawned rather than forked, the server process has threads running
+    return ProcessPoolExecutor(
+        max_workers=worker_count, mp_context=multiprocessing.get_context("spawn")
+    )
+
+
+def run_scenarios(
+    executor: ProcessPoolExecutor,
+    graph_path: Path,
+    source: str,
+    scenarios: list[SwitchingScenario],
+    batch_size: int,
+) -> Iterator[ScenarioResult]:
+    futures: list[Future[list[ScenarioResult]]] = []
+    for start in range(0, len(scenarios), batch_size):
+        stop: int = start + batch_size
+        batch: list[SwitchingScenario] = scenarios[start:stop]
+        futures.append(executor.submit(evaluate_scenarios, graph_path, source, batch))
+    try:
+        for future in as_completed(futures):
+            yield from future.result()
+    finally:
+        for future in futures:
+            future.cancel()
+
+
+def scenario_result_dict(result: ScenarioResult, completed: int, total: int) -> dict[str, Any]:
+    return result._asdict() | {"completed": completed, "total": total}
@@ -0,0 +1,245 @@
+import gzip
+import math
+import multiprocessing
+import os
+import sqlite3
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Any
+
+import msgspec
+
+from src.database import (
+    GEOMETRY_FIELD_NAME,
+    LevelOfDetail,
+    create_connection,
+    level_of_detail_table,
+)
+from src.facets import FACET_TABLE
+from src.geometry import (
+    MIN_FEATURE_PIXELS,
+    Bounds,
+    create_feature_dict,
+    level_of_detail_from_zoom,
+    resolution_from_zoom,
+)
+
+
+# Web Mercator does not reach the poles
+MAX_LATITUDE: float = 85.05112878
+
+TileCoordinate = tuple[int, int, int]
+
+
+def tile_bounds(zoom: int, x: int, y: int) -> Bounds:
+    tile_count: int = 2**zoom
+
+    def latitude(tile_y: int) -> float:
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * tile_y / tile_count))))
+
+    return Bounds(
+        x / tile_count * 360 - 180,
+        latitude(y + 1),
+        (x + 1) / tile_count * 360 - 180,
+        latitude(y),
+    )
+
+
+def tiles_covering(bounds: Bounds, zoom: int) -> list[TileCoordinate]:
+    tile_count: int = 2**zoom
+
+    def tile_x(longitude: float) -> int:
+        return min(tile_count - 1, max(0, int((longitude + 180) / 360 * tile_count)))
+
+    def tile_y(latitude: float) -> int:
+        latitude = math.radians(max(-MAX_LATITUDE, min(MAX_LATITUDE, latitude)))
+        y: float = (1 - math.asinh(math.tan(latitude)) / math.pi) / 2 * tile_count
+        return min(tile_count - 1, max(0, int(y)))
+
+    return [
+        (zoom, x, y)
+        for x in range(tile_x(bounds.min_x), tile_x(bounds.max_x) + 1)
+        for y in range(tile_y(bounds.max_y), tile_y(bounds.min_y) + 1)
+    ]
+
+
+def tile_property_columns(connection: sqlite3.Connection) -> list[str]:
+    # Tiles carry the faceted, low cardinality, columns so any of them can be coloured by
+    cursor = connection.cursor()
+    cursor.execute(f"SELECT DISTINCT column_name FROM {FACET_TABLE} WHERE depth = 0;")
+    columns: list[str] = ["name"] + [row[0] for row in cursor.fetchall() if row[0] != "name"]
+    cursor.close()
+    return columns
+
+
+def render_tile(
+    connection: sqlite3.Connection, tile: TileCoordinate, property_columns: list[str]
+) -> bytes | None:
+    zoom, x, y = tile
+    bounds: Bounds = tile_bounds(zoom, x, y)
+    table_name: str = level_of_detail_table(level_of_detail_from_zoom(zoom))
+    resolution: float = resolution_from_zoom(zoom)
+    latitude: float = math.radians((bounds.min_y + bounds.max_y) / 2)
+    min_size_x: float = MIN_FEATURE_PIXELS * resolution
+    min_size_y: float = MIN_FEATURE_PIXELS * resolution * math.cos(latitude)
+
+    # Culled like `get_geojson_from_bounds`, and simplified to the tile's resolution
+    cursor = connection.cursor()
+    cursor.execute(
+        f"""
+        SELECT
+            {", ".join(property_columns)},
+            AsText(SimplifyPreserveTopology({GEOMETRY_FIELD_NAME}, ?))
+        FROM {table_name}
+        JOIN idx_{table_name}_{GEOMETRY_FIELD_NAME} AS r
+        ON id = r.pkid
+        WHERE r.xmax >= ? AND r.xmin <= ? AND r.ymax >= ? AND r.ymin <= ?
+        AND (
+            r.xmax - r.xmin >= ? OR r.ymax - r.ymin >= ?
+            OR GeometryType({GEOMETRY_FIELD_NAME}) = 'POINT'
+        );
+        """,
+        [
+            resolution,
+            bounds.min_x,
+            bounds.max_x,
+            bounds.min_y,
+            bounds.max_y,
+            min_size_x,
+            min_size_y,
+        ],
+    )
+    features: list[dict[str, Any]] = [
+        create_feature_dict(row[-1], dict(zip(property_columns, row[:-1])))
+        for row in cursor.fetchall()
+        if row[-1] is not None
+    ]
+    cursor.close()
+
+    if not features:
+        return None
+    geojson: bytes = msgspec.json.encode({"type": "FeatureCollection", "features": features})
+    return gzip.compress(geojson, mtime=0)
+
+
+def render_tiles(
+    db_path: Path, tiles: list[TileCoordinate], property_columns: list[str]
+) -> list[tuple[TileCoordinate, bytes]]:
+    # Runs in a worker process, with its own connection
+    connection: sqlite3.Connection = create_connection(db_path)
+    rendered: list[tuple[TileCoordinate, bytes]] = []
+    for tile in tiles:
+        data: bytes | None = render_tile(connection, tile, property_columns)
+        if data is not None:
+            rendered.append((tile, data))
+    connection.close()
+    return rendered
+
+
+def data_bounds(connection: sqlite3.Connection) -> Bounds | None:
+    table_name: str = level_of_detail_table(LevelOfDetail.ALL)
+    cursor = connection.cursor()
+    cursor.execute(f"""
+    SELECT
+        MIN(MbrMinX({GEOMETRY_FIELD_NAME})),
+        MIN(MbrMinY({GEOMETRY_FIELD_NAME})),
+        MAX(MbrMaxX({GEOMETRY_FIELD_NAME})),
+        MAX(MbrMaxY({GEOMETRY_FIELD_NAME}))
+    FROM {table_name};
+    """)
+    row = cursor.fetchone()
+    cursor.close()
+    if row is None or row[0] is None:
+        return None
+    return Bounds(*row)
+
+
+def create_tile_archive(
+    db_path: Path, tiles_path: Path, max_zoom: int, worker_count: int, batch_size: int
+) -> None:
+    start_time: float = time.perf_counter()
+    connection: sqlite3.Connection = create_connection(db_path)
+    bounds: Bounds | None = data_bounds(connection)
+    property_columns: list[str] = tile_property_columns(connection)
+    connection.close()
+    if bounds is None:
+        print("No geometry to render tiles for")
+        return
+
+    tiles: list[TileCoordinate] = [
+        tile for zoom in range(max_zoom + 1) for tile in tiles_covering(bounds, zoom)
+    ]
+    print(f"Rendering {len(tiles)} tiles for zoom levels 0 to {max_zoom}")
+
+    # Written next to the archive and swapped in, so the server never reads a partial one
+    temporary_path: Path = tiles_path.with_suffix(".tmp")
+    if os.path.exists(temporary_path):
+        os.remove(temporary_path)
+    archive: sqlite3.Connection = sqlite3.connect(temporary_path)
+    archive.execute("CREATE TABLE metadata (name TEXT, value TEXT);")
+    archive.execute("""
+    CREATE TABLE tiles (
+        zoom_level INTEGER,
+        tile_column INTEGER,
+        tile_row INTEGER,
+        tile_data BLOB,
+        PRIMARY KEY (zoom_level, tile_column, tile_row)
+    );
+    """)
+    archive.executemany(
+        "INSERT INTO metadata VALUES (?, ?);",
+        [
+            ("name", "connectivity"),
+            ("format", "geojson"),
+            ("compression", "gzip"),
+            ("minzoom", "0"),
+            ("maxzoom", str(max_zoom)),
+            ("bounds", ",".join(str(value) for value in bounds)),
+        ],
+    )
+
+    rendered_count: int = 0
+    with ProcessPoolExecutor(
+        max_workers=worker_count, mp_context=multiprocessing.get_context("spawn")
+    ) as executor:
+        futures: list[Future[list[tuple[TileCoordinate, bytes]]]] = []
+        for start in range(0, len(tiles), batch_size):
+            stop: int = start + batch_size
+            futures.append(
+                executor.submit(render_tiles, db_path, tiles[start:stop], property_columns)
+            )
+        for completed, future in enumerate(as_completed(futures), start=1):
+            rendered: list[tuple[TileCoordinate, bytes]] = future.result()
+            # MBTiles rows count up from the south, unlike XYZ tile coordinates
+            archive.executemany(
+                "INSERT INTO tiles VALUES (?, ?, ?, ?);",
+                [(zoom, x, 2**zoom - 1 - y, data) for (zoom, x, y), data in rendered],
+            )
+            rendered_count += len(rendered)
+            if completed % 10 == 0 or completed == len(futures):
+                print(f"Rendered {completed}/{len(futures)} tile batches")
+
+    archive.commit()
+    archive.close()
+    os.replace(temporary_path, tiles_path)
+    print(
+        f"Wrote {rendered_count} non-empty tiles to `{tiles_path}` "
+        f"in {time.perf_counter() - start_time:.2f}s"
+    )
+
+
+def get_tile(tiles_path: Path, zoom: int, x: int, y: int) -> bytes | None:
+    try:
+        archive: sqlite3.Connection = sqlite3.connect(f"file:{tiles_path}?mode=ro", uri=True)
+    except sqlite3.OperationalError:
+        return None
+    cursor = archive.cursor()
+    cursor.execute(
+        "SELECT tile_data FROM tiles WHERE zoom_level = ? AND tile_column = ? AND tile_row = ?;",
+        [zoom, x, 2**zoom - 1 - y],
+    )
+    row = cursor.fetchone()
+    cursor.close()
+    archive.close()
+    return row[0] if row is not None else None
@@ -0,0 +1,81 @@
+import mmap
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable
+
+
+WarmUpStep = tuple[str, Callable[[], Any]]
+
+
+def touch_file_pages(path: Path, limit_bytes: int) -> int:
+    # Reading a byte of every page pulls the file into the OS page cache, which SQLite's
+    # memory mapped reads then hit
+    if not path.exists():
+        return 0
+    with open(path, "rb") as f:
+        size: int = min(path.stat().st_size, limit_bytes)
+        if size == 0:
+            return 0
+        with mmap.mmap(f.fileno(), size, access=mmap.ACCESS_READ) as mapped:
+            if hasattr(mmap, "MADV_WILLNEED"):
+                mapped.madvise(mmap.MADV_WILLNEED)
+            checksum: int = 0
+            for offset in range(0, size, mmap.PAGESIZE):
+                checksum ^= mapped[offset]
+    return size
+
+
+def touch_spatial_indexes(connection: sqlite3.Connection) -> int:
+    # Counting rows walks every page of each R-tree's node table
+    cursor = connection.cursor()
+    cursor.execute("""
+    SELECT name FROM sqlite_master
+    WHERE type = 'table' AND sql LIKE 'CREATE VIRTUAL TABLE%USING rtree%';
+    """)
+    rtree_names: list[str] = [row[0] for row in cursor.fetchall()]
+    for rtree_name in rtree_names:
+        cursor.execute(f"SELECT COUNT(*) FROM {rtree_name}_node;")
+        cursor.fetchone()
+    cursor.close()
+    return len(rtree_names)
+
+
+class WarmUpStatus:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.ready: bool = False
+        self.step_seconds: dict[str, float] = {}
+        self.failed_steps: list[str] = []
+
+    def run(self, steps: list[WarmUpStep]) -> None:
+        start_time: float = time.perf_counter()
+        for name, step in steps:
+            step_start: float = time.perf_counter()
+            try:
+                step()
+            except Exception as e:
+                # A failed step leaves that cache cold, requests still fall back to SQLite
+                print(f"Warm-up step `{name}` failed: {e}")
+                with self._lock:
+                    self.failed_steps.append(name)
+            with self._lock:
+                self.step_seconds[name] = time.perf_counter() - step_start
+        with self._lock:
+            self.ready = True
+        print(f"Warm-up complete in {time.perf_counter() - start_time:.2f}s")
+
+    def start(self, steps: list[WarmUpStep]) -> threading.Thread:
+        # The server answers while warming up, so readiness can be polled
+        thread = threading.Thread(target=self.run, args=(steps,), name="warm-up", daemon=True)
+        thread.start()
+        return thread
+
+    def status_dict(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "ready": self.ready,
+                "step_seconds": dict(self.step_seconds),
+                "failed_steps": list(self.failed_steps),
+            }
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+import sys
+from argparse import ArgumentParser
+from pathlib import Path
+from typing import IO
+
+import msgspec
+
+from src.csr_graph import read_csr_graph
+from src.database import create_connection
+from src.graph import get_source_node
+from src.switching import (
+    SwitchingScenario,
+    create_switching_executor,
+    each_edge_scenarios,
+    run_scenarios,
+    scenario_result_dict,
+)
+
+
+DATA_PATH: Path = Path(__file__).parent / "data"
+
+DEFAULT_DATABASE_PATH: Path = DATA_PATH / "common_model.db"
+DEFAULT_GRAPH_PATH: Path = DATA_PATH / "graphs"
+
+
+def read_scenarios_file(path: Path) -> list[SwitchingScenario]:
+    scenarios: list[SwitchingScenario] = []
+    with open(path, "r") as f:
+        for line in f:
+            edges: list[str] = [edge.strip() for edge in line.split(",") if edge.strip()]
+            if edges:
+                scenarios.append(SwitchingScenario(len(scenarios), edges))
+    return scenarios
+
+
+def main() -> None:
+    parser = ArgumentParser(
+        description="Evaluate switching scenarios for a GXP, writing one JSON line per scenario."
+    )
+
+    parser.add_argument("gxp", type=str, help="GXP whose graph the scenarios are run against")
+    parser.add_argument(
+        "--db-path",
+        type=str,
+        default=DEFAULT_DATABASE_PATH,
+        help=f"Path to the SQLite database (default: {DEFAULT_DATABASE_PATH})",
+    )
+    parser.add_argument(
+        "--graph-path",
+        type=str,
+        default=DEFAULT_GRAPH_PATH,
+        help=f"Path to the graph files (default: {DEFAULT_GRAPH_PATH})",
+    )
+    parser.add_argument(
+        "--source",
+        type=str,
+        default=None,
+        help="Node the GXP is supplied from (default: the GXP's highest voltage node)",
+    )
+    scenario_group = parser.add_mutually_exclusive_group(required=True)
+    scenario_group.add_argument(
+        "--scenarios-path",
+        type=str,
+        help="File with one scenario per line, as comma separated edges to switch out",
+    )
+    scenario_group.add_argument(
+        "--each-edge",
+        action="store_true",
+        help="Switch out every edge energised from the source, one at a time",
+    )
+    parser.add_argument("--workers", type=int, default=4, help="Worker processes")
+    parser.add_argument("--batch-size", type=int, default=64, help="Scenarios per task")
+    parser.add_argument(
+        "--output-path", type=str, default=None, help="Output file (default: stdout)"
+    )
+
+    args = parser.parse_args()
+
+    graph_path: Path = Path(args.graph_path) / args.gxp
+
+    source: str | None = args.source
+    if source is None:
+        connection = create_connection(Path(args.db_path))
+        source = get_source_node(connection, args.gxp)
+        connection.close()
+    if source is None:
+        print(f"No source node found for GXP `{args.gxp}`", file=sys.stderr)
+        sys.exit(1)
+    print(f"Source node: `{source}`", file=sys.stderr)
+
+    scenarios: list[SwitchingScenario] = (
+        each_edge_scenarios(read_csr_graph(graph_path), source)
+        if args.each_edge
+        else read_scenarios_file(Path(args.scenarios_path))
+    )
+    print(f"Evaluating {len(scenarios)} scenarios", file=sys.stderr)
+
+    output: IO[bytes] = (
+        open(args.output_path, "wb") if args.output_path is not None else sys.stdout.buffer
+    )
+    with create_switching_executor(args.workers) as executor:
+        results = run_scenarios(executor, graph_path, source, scenarios, args.batch_size)
+        for completed, result in enumerate(results, start=1):
+            output.write(
+                msgspec.json.encode(scenario_result_dict(result, completed, len(scenarios)))
+            )
+            output.write(b"\n")
+            if completed % 100 == 0 or completed == len(scenarios):
+                print(f"Completed {completed}/{len(scenarios)} scenarios", file=sys.stderr)
+    if args.output_path is not None:
+        output.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,6 @@
 import * as React from "react";
 import { generateColorMapping } from "../utils/colors";
+import { fetchAllPages } from "../utils/pagination";
 import { API_URL } from "../config/api";
 import { useHierarchy, addHierarchyToURL } from "./HierarchyContext";
 
@@ -47,8 +48,7 @@ export function ColouringProvider({
       `${API_URL}column_unique_values?column=${colouringContext.category}`,
     );
 
-    fetch(url)
-      .then((response) => response.json())
+    fetchAllPages<string | number>(url)
       .then((data) => {
         if (!data || data.length === 0) return;
 
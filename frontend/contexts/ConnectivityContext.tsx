@@ -1,6 +1,7 @@
 import * as React from "react";
 import { API_URL } from "../config/api";
 import { useHierarchy, addHierarchyToURL } from "./HierarchyContext";
+import { fetchAllPages } from "../utils/pagination";
 
 interface ConnectivityContextType {
   // Shortest path state
@@ -196,9 +197,8 @@ export function ConnectivityProvider({
 
       const abortController = new AbortController();
 
-      fetch(url, { signal: abortController.signal })
-        .then((response) => response.json())
-        .then((data: string[]) => {
+      fetchAllPages<string>(url, { signal: abortController.signal })
+        .then((data) => {
           if (!abortController.signal.aborted) {
             const notFound = data.length === 0;
             setFloodFillNotFound(notFound);
@@ -10,6 +10,7 @@ import ColorPicker from "./ColorPicker";
 import { useHierarchy, addHierarchyToURL } from "../../contexts/HierarchyContext";
 import { useColouring } from "../../contexts/ColouringContext";
 import { useSelection } from "../../contexts/SelectionContext";
+import { fetchAllPages } from "../../utils/pagination";
 import { API_URL } from "../../config/api";
 
 export default function ColouringPanel() {
@@ -61,8 +62,7 @@ export default function ColouringPanel() {
           hierarchyView,
           `${API_URL}all_with_attribute?column=${encodeURIComponent(selectedValue)}&value=${encodeURIComponent(value)}`
         );
-        const response = await fetch(url);
-        const assetNames = await response.json();
+        const assetNames = await fetchAllPages<string>(url);
 
         if (assetNames && Array.isArray(assetNames)) {
           setSelectedAssets(assetNames);
@@ -130,13 +130,13 @@ export default function ColouringPanel() {
 
     const url = addHierarchyToURL(
       hierarchyView,
-      `${API_URL}column_unique_values?column=${selectedValue}`,
+      `${API_URL}column_unique_values?column=${selectedValue}&limit=50`,
     );
 
     fetch(url)
       .then((response) => response.json())
       .then((data) => {
-        setCategoryValues(data.slice(0, 50));
+        setCategoryValues(data);
         setCategory(selectedValue);
       });
   }, [selectedValue, hierarchyView, setCategory]);
@@ -0,0 +1,24 @@
+/**
+ * Header holding the cursor of the next page, absent on the last page
+ */
+export const NEXT_CURSOR_HEADER = "X-Next-Cursor";
+
+/**
+ * Fetch every page of a paginated list endpoint, following the next page cursor
+ * @param url - Endpoint URL, already carrying a query string
+ * @param init - Options passed to every fetch, e.g. an abort signal
+ * @returns The values of all pages, in order
+ */
+export async function fetchAllPages<T>(url: string, init?: RequestInit): Promise<T[]> {
+  const values: T[] = [];
+  let cursor: string | null = null;
+  do {
+    const pageUrl: string =
+      cursor === null ? url : `${url}&after=${encodeURIComponent(cursor)}`;
+    const response: Response = await fetch(pageUrl, init);
+    const page: T[] = await response.json();
+    values.push(...page);
+    cursor = response.headers.get(NEXT_CURSOR_HEADER);
+  } while (cursor !== null);
+  return values;
+}